@@ -0,0 +1,92 @@
+# Spawn latency and teardown time of process trees.
+#
+# Compares spawning processes in their own process group with a preexec_fn
+# (os.setpgrp, forcing subprocess to fork) against process_group=0 or
+# start_new_session (letting subprocess use vfork), and terminating trees
+# by walking their descendants against signaling their process group.
+#
+#     $ python benchmarks/bench_process_groups.py --spawns 200 --children 50
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from xprocess.termination import terminate_trees
+
+# root of a process tree with ``children`` descendants, waiting for them
+# to be started before printing "started"
+TREE = """
+import subprocess, sys, time
+children = [
+    subprocess.Popen(["sleep", "60"]) for _ in range(int(sys.argv[1]))
+]
+print("started", flush=True)
+time.sleep(60)
+"""
+
+
+def spawn_kwargs(mode):
+    if mode == "preexec_fn":
+        return {"preexec_fn": os.setpgrp}
+    if mode == "process_group" and sys.version_info >= (3, 11):
+        return {"process_group": 0}
+    return {"start_new_session": True}
+
+
+def bench_spawn(mode, spawns):
+    """Return the mean time in seconds Popen takes to return."""
+    total = 0
+    for _ in range(spawns):
+        start = time.perf_counter()
+        proc = subprocess.Popen(["true"], close_fds=True, **spawn_kwargs(mode))
+        total += time.perf_counter() - start
+        proc.wait()
+    return total / spawns
+
+
+def bench_teardown(grouped, children):
+    """Return the time in seconds terminating a tree of ``children``
+    processes takes, signaling its process group or each process."""
+    kwargs = spawn_kwargs("process_group") if grouped else {}
+    proc = subprocess.Popen(
+        [sys.executable, "-c", TREE, str(children)],
+        stdout=subprocess.PIPE,
+        **kwargs,
+    )
+    proc.stdout.readline()
+    start = time.perf_counter()
+    (code,) = terminate_trees([proc.pid])
+    elapsed = time.perf_counter() - start
+    proc.wait()
+    proc.stdout.close()
+    assert code == 1, code
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Spawn latency and teardown time of process trees."
+    )
+    parser.add_argument("--spawns", type=int, default=100)
+    parser.add_argument("--children", type=int, default=50)
+    parser.add_argument(
+        "--ballast-mb",
+        type=int,
+        default=256,
+        help="memory held by the benchmark process, forking copies its page tables",
+    )
+    args = parser.parse_args(argv)
+    ballast = bytearray(args.ballast_mb * 1024 * 1024)  # noqa: F841
+
+    for mode in ("preexec_fn", "process_group"):
+        mean = bench_spawn(mode, args.spawns)
+        print(f"spawn {mode:<16} {mean * 1e3:8.3f} ms")
+    for grouped in (False, True):
+        elapsed = bench_teardown(grouped, args.children)
+        how = "killpg" if grouped else "walk tree"
+        print(f"teardown {args.children} children, {how:<10} {elapsed * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+# Overhead of xprocess itself, written to a stable JSON format.
+#
+# Benchmarks, selected with --only:
+#
+#     ensure        XProcess.ensure latency for cold starts, reuse, restarts
+#                   and overlapped restarts of tests/server.py
+#     wait_pattern  ProcessStarter.wait throughput on logs of --lines lines,
+#                   searched line by line and in binary chunks
+#     skip_blocks   XProcess._skip_previous_log_blocks on persisted logs of
+#                   --log-mb MiB, with and without an up to date index
+#     terminate     XProcessInfo.terminate on trees of --tree-sizes processes
+#     makereport    per test overhead of the pytest_runtest_setup and
+#                   pytest_runtest_makereport hooks with --logs registered logs
+#
+# Results of a previous run can be passed to --compare, in which case the exit
+# status is 1 if the median of any benchmark grew by more than --max-ratio:
+#
+#     $ python benchmarks/bench_xprocess.py --output baseline.json
+#     $ python benchmarks/bench_xprocess.py --compare baseline.json
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import types
+from importlib.metadata import PackageNotFoundError
+from importlib.metadata import version
+
+import py
+
+from xprocess import ProcessStarter
+from xprocess import pytest_xprocess
+from xprocess import XProcess
+from xprocess import XProcessInfo
+from xprocess.logs import BLOCK_DELIMITER_LINE
+
+# bumped whenever the layout of the JSON output changes
+SCHEMA_VERSION = 1
+
+SERVER = os.path.join(os.path.dirname(__file__), os.pardir, "tests", "server.py")
+
+
+class NullLog:
+    # startup lines are echoed by XProcess.log, keep terminal I/O out of
+    # the measurements
+    def debug(self, msg, *args):
+        pass
+
+
+def make_xprocess(rootdir):
+    config = types.SimpleNamespace()
+    return XProcess(config, py.path.local(rootdir), log=NullLog())
+
+
+def server_starter(children=0):
+    class Starter(ProcessStarter):
+        pattern = "finally started"
+        # tests/server.py binds an ephemeral port when passed 0
+        args = [sys.executable, SERVER, "0"] + (
+            ["--children", str(children)] if children else ["--no-children"]
+        )
+        max_read_lines = None
+
+    return Starter
+
+
+def result(benchmark, case, params, timings, **extra):
+    return {
+        "benchmark": benchmark,
+        "case": case,
+        "params": params,
+        "unit": "seconds",
+        "runs": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "max": max(timings),
+        "extra": extra,
+    }
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def bench_ensure(args, rootdir):
+    xprocess = make_xprocess(rootdir)
+    starter = server_starter()
+    overlapped = server_starter()
+    overlapped.restart_overlap = True
+    timings = {"cold": [], "reuse": [], "restart": [], "restart_overlap": []}
+    try:
+        for _ in range(args.runs):
+            timings["cold"].append(timed(xprocess.ensure, "ensure", starter))
+            timings["reuse"].append(timed(xprocess.ensure, "ensure", starter))
+            timings["restart"].append(timed(xprocess.ensure, "ensure", starter, True))
+            timings["restart_overlap"].append(
+                timed(xprocess.ensure, "ensure", overlapped, True)
+            )
+            xprocess.getinfo("ensure").terminate()
+    finally:
+        xprocess.getinfo("ensure").terminate()
+        # waits for the instances replaced by overlapped restarts
+        xprocess.__exit__(None, None, None)
+        xprocess._force_clean_up()
+    return [result("ensure", case, {}, t) for case, t in timings.items()]
+
+
+def write_lines(path, lines):
+    chunk = b"spam, bacon, eggs\n" * 10000
+    with open(path, "wb") as f:
+        for written in range(0, lines, 10000):
+            f.write(chunk[: min(10000, lines - written) * 18])
+        f.write(b"started\n")
+
+
+def bench_wait_pattern(args, rootdir):
+    results = []
+    xprocess = make_xprocess(rootdir)
+    for lines in args.lines:
+        path = os.path.join(rootdir, f"wait_pattern-{lines}.log")
+        write_lines(path, lines)
+        # searched line by line, or in binary chunks
+        for case, max_read_lines in (("lines", lines + 1), ("chunks", None)):
+
+            class Starter(ProcessStarter):
+                pattern = "^started$"
+                args = ["unused"]
+
+            Starter.max_read_lines = max_read_lines
+            timings = []
+            for _ in range(args.runs):
+                starter = Starter(py.path.local(rootdir), xprocess)
+                with open(path, errors="surrogateescape") as log_file:
+                    timings.append(timed(starter.wait, log_file))
+            median = statistics.median(timings)
+            results.append(
+                result(
+                    "wait_pattern",
+                    case,
+                    {"lines": lines},
+                    timings,
+                    lines_per_second=round(lines / median),
+                )
+            )
+        os.remove(path)
+    return results
+
+
+def write_blocks(path, megabytes, block_bytes=4 * 1024 * 1024):
+    """Write a persisted log of ``megabytes`` MiB made of blocks of
+    ``block_bytes`` bytes, as a process restarted many times would have."""
+    line = b"spam, bacon, eggs\n"
+    block = BLOCK_DELIMITER_LINE + line * (block_bytes // len(line))
+    with open(path, "wb") as f:
+        for _ in range(max(megabytes * 1024 * 1024 // len(block), 1)):
+            f.write(block)
+
+
+def bench_skip_blocks(args, rootdir):
+    results = []
+    xprocess = make_xprocess(rootdir)
+    for megabytes in args.log_mb:
+        info = XProcessInfo(py.path.local(rootdir), f"skip-{megabytes}")
+        write_blocks(str(info.logpath), megabytes)
+        timings = {"no index": [], "index": []}
+        for _ in range(args.runs):
+            index = f"{info.logpath}.idx"
+            if os.path.exists(index):
+                os.remove(index)
+            for case in ("no index", "index"):
+                with open(str(info.logpath), errors="surrogateescape") as handle:
+                    timings[case].append(
+                        timed(xprocess._skip_previous_log_blocks, info, handle)
+                    )
+        shutil.rmtree(str(info.controldir))
+        results += [
+            result("skip_blocks", case, {"megabytes": megabytes}, t)
+            for case, t in timings.items()
+        ]
+    return results
+
+
+def bench_terminate(args, rootdir):
+    results = []
+    xprocess = make_xprocess(rootdir)
+    try:
+        for size in args.tree_sizes:
+            # the server itself is part of the tree
+            starter = server_starter(children=size - 1)
+            timings = []
+            for _ in range(args.runs):
+                xprocess.ensure(f"tree-{size}", starter, restart=True)
+                info = xprocess.getinfo(f"tree-{size}")
+                timings.append(timed(info.terminate))
+            results.append(result("terminate", "tree", {"processes": size}, timings))
+    finally:
+        xprocess._force_clean_up()
+    return results
+
+
+class Report:
+    def __init__(self, failed):
+        self.failed = failed
+        self.longrepr = self
+        self.sections = []
+
+    def addsection(self, name, content):
+        self.sections.append((name, content))
+
+
+class Outcome:
+    def __init__(self, report):
+        self.report = report
+
+    def get_result(self):
+        return self.report
+
+
+def run_hookwrapper(hook, *args, outcome=None):
+    gen = hook(*args)
+    next(gen)
+    try:
+        gen.send(outcome)
+    except StopIteration:
+        pass
+
+
+def bench_makereport(args, rootdir):
+    results = []
+    ini = {"xprocess_log_tail_bytes": "65536"}
+    for logs in args.logs:
+        handles = {}
+        for n in range(logs):
+            path = os.path.join(rootdir, f"makereport-{n}.log")
+            with open(path, "w") as f:
+                f.write("spam, bacon, eggs\n" * 100)
+            handles[f"process-{n}"] = open(path, errors="surrogateescape")
+        config = types.SimpleNamespace(_extlogfiles=handles, getini=ini.get)
+        for case, failed in (("passed", False), ("failed", True)):
+            timings = []
+            for _ in range(args.runs * 10):
+                item = types.SimpleNamespace(config=config)
+                start = time.perf_counter()
+                run_hookwrapper(pytest_xprocess.pytest_runtest_setup, item)
+                # reports of the setup, call and teardown phases
+                for _ in range(3):
+                    run_hookwrapper(
+                        pytest_xprocess.pytest_runtest_makereport,
+                        item,
+                        None,
+                        outcome=Outcome(Report(failed)),
+                    )
+                timings.append(time.perf_counter() - start)
+            results.append(result("makereport", case, {"logs": logs}, timings))
+        for handle in handles.values():
+            handle.close()
+    return results
+
+
+BENCHMARKS = {
+    "ensure": bench_ensure,
+    "wait_pattern": bench_wait_pattern,
+    "skip_blocks": bench_skip_blocks,
+    "terminate": bench_terminate,
+    "makereport": bench_makereport,
+}
+
+
+def environment():
+    try:
+        xprocess_version = version("pytest-xprocess")
+    except PackageNotFoundError:  # pragma: no cover
+        xprocess_version = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pytest-xprocess": xprocess_version,
+    }
+
+
+def result_key(entry):
+    return (entry["benchmark"], entry["case"], json.dumps(entry["params"]))
+
+
+def compare(results, baseline, max_ratio):
+    """Print how the median of each benchmark changed since ``baseline``
+    and return the number of benchmarks which regressed."""
+    previous = {result_key(entry): entry for entry in baseline["results"]}
+    regressions = 0
+    for entry in results:
+        before = previous.get(result_key(entry))
+        if before is None or not before["median"]:
+            continue
+        ratio = entry["median"] / before["median"]
+        regressed = ratio > max_ratio
+        regressions += regressed
+        print(
+            "{} {} {} {:.2f}x{}".format(
+                entry["benchmark"],
+                entry["case"],
+                json.dumps(entry["params"]),
+                ratio,
+                " REGRESSED" if regressed else "",
+            )
+        )
+    return regressions
+
+
+def int_list(value):
+    return [int(n) for n in value.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Overhead of xprocess itself, written to a stable JSON format."
+    )
+    parser.add_argument("--only", type=lambda v: v.split(","), default=list(BENCHMARKS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--lines", type=int_list, default=[10000, 100000, 1000000])
+    parser.add_argument("--log-mb", type=int_list, default=[64, 512])
+    parser.add_argument("--tree-sizes", type=int_list, default=[1, 10, 100, 500])
+    parser.add_argument("--logs", type=int_list, default=[1, 10, 100])
+    parser.add_argument("--output", help="write results to this file")
+    parser.add_argument("--compare", help="results of a previous run")
+    parser.add_argument("--max-ratio", type=float, default=1.25)
+    args = parser.parse_args(argv)
+    unknown = set(args.only) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = []
+    rootdir = tempfile.mkdtemp(prefix="xprocess-bench-")
+    try:
+        for name in BENCHMARKS:
+            if name in args.only:
+                print(f"running {name}", file=sys.stderr)
+                results += BENCHMARKS[name](args, rootdir)
+    finally:
+        shutil.rmtree(rootdir, ignore_errors=True)
+
+    data = {
+        "schema": SCHEMA_VERSION,
+        "environment": environment(),
+        "results": results,
+    }
+    output = json.dumps(data, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    elif not args.compare:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return 1 if compare(results, baseline, args.max_ratio) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
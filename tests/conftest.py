@@ -1,4 +1,5 @@
 import socket
+import sys
 from contextlib import closing
 
 import pytest
@@ -7,6 +8,36 @@ from xprocess import ProcessStarter
 
 pytest_plugins = "pytester"
 
+# logs "started", followed by the other arguments, once it has slept for
+# argv[1] seconds, then keeps running
+SLOW_START = (
+    "import sys, time; time.sleep(float(sys.argv[1])); "
+    "print('started', *sys.argv[2:], flush=True); time.sleep(60)"
+)
+
+
+@pytest.fixture
+def make_starter():
+    """factory of ProcessStarter subclasses, or of ``base`` subclasses,
+    running a python script with the given arguments, SLOW_START by
+    default, until it logs ``pattern``. Other keyword arguments are set as
+    class attributes."""
+
+    def make_starter(
+        *args, script=SLOW_START, pattern="started", base=ProcessStarter, **attrs
+    ):
+        argv = [sys.executable, "-c", script, *map(str, args)]
+
+        class Starter(base):
+            args = argv
+
+        Starter.pattern = pattern
+        for name, value in attrs.items():
+            setattr(Starter, name, value)
+        return Starter
+
+    return make_starter
+
 
 @pytest.fixture
 def example(xprocess):
@@ -82,8 +82,12 @@ if __name__ == "__main__":
         # ignore sigterm for testing XProcessInfo.terminate
         # when processes fail to exit
         signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    children = 3
+    if "--children" in sys.argv:
+        # size of the process tree, e.g. for benchmarking termination
+        children = int(sys.argv[sys.argv.index("--children") + 1])
     if "--no-children" not in sys.argv:
-        server.fork_children(do_nothing, 3)
+        server.fork_children(do_nothing, children)
 
     server.write_test_patterns()
     server.serve_forever()
@@ -0,0 +1,81 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+from xprocess import AsyncProcessStarter
+
+server_path = Path(__file__).parent.joinpath("server.py").absolute()
+
+
+async def request_response_cycle(tcp_port, data):
+    reader, writer = await asyncio.open_connection("localhost", tcp_port)
+    try:
+        writer.write(bytes(data, "utf-8"))
+        await writer.drain()
+        received = await reader.readline()
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return received.decode() == data.upper()
+
+
+def test_aensure_async_startup_check(xprocess, tcp_port):
+    class Starter(AsyncProcessStarter):
+        pattern = "started"
+        args = [sys.executable, server_path, tcp_port, "--no-children"]
+
+        async def startup_check(self):
+            return await request_response_cycle(tcp_port, "bacon\n")
+
+    pid, logpath = asyncio.run(xprocess.aensure("async_server", Starter))
+    info = xprocess.getinfo("async_server")
+    assert info.pid == pid
+    assert info.isrunning()
+    info.terminate()
+
+
+def test_aensure_starts_concurrently(xprocess, make_starter):
+    Starter = make_starter(1, base=AsyncProcessStarter)
+
+    async def main():
+        return await asyncio.gather(
+            xprocess.aensure("async_a", Starter),
+            xprocess.aensure("async_b", Starter),
+            xprocess.aensure("async_c", make_starter(1)),
+        )
+
+    results = asyncio.run(main())
+    names = ("async_a", "async_b", "async_c")
+    # every process was spawned before any of them was ready
+    created = [xprocess.getinfo(name).read_state()["create_time"] for name in names]
+    assert max(created) < min(created) + 1
+    for name in names:
+        info = xprocess.getinfo(name)
+        assert (info.pid, info.logpath) in results
+        info.terminate()
+
+
+def test_aensure_cancelled_while_waiting_for_lock(xprocess, make_starter):
+    Starter = make_starter(0, base=AsyncProcessStarter)
+    info = xprocess.getinfo("async_cancelled")
+    info.controldir.ensure(dir=1)
+    held = info.lock().acquire()
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(xprocess.aensure("async_cancelled", Starter), 0.2)
+        held.release()
+
+    asyncio.run(main())
+    # taken by the cancelled call once released, and given up right away
+    info.lock().acquire(timeout=1).release()
+    assert not info.isrunning()
+
+
+def test_ensure_with_async_starter(xprocess, make_starter):
+    xprocess.ensure("async_sync_call", make_starter(0, base=AsyncProcessStarter))
+    info = xprocess.getinfo("async_sync_call")
+    assert info.isrunning()
+    info.terminate()
@@ -0,0 +1,64 @@
+import shutil
+import sys
+
+import pytest
+
+from xprocess import ProcessStarter
+
+
+def test_independent_processes_start_concurrently(xprocess, make_starter):
+    names = ["all_a", "all_b", "all_c"]
+    results = xprocess.ensure_all(
+        ((name, make_starter(1)) for name in names), restart=True
+    )
+    assert sorted(results) == names
+    # every process was spawned before any of them was ready
+    created = [xprocess.getinfo(name).read_state()["create_time"] for name in names]
+    assert max(created) < min(created) + 1
+    for name in names:
+        info = xprocess.getinfo(name)
+        assert info.isrunning()
+        assert results[name] == (info.pid, info.logpath)
+        info.terminate()
+
+
+def test_dependencies_are_ready_first(xprocess, make_starter):
+    class Dependent(ProcessStarter):
+        pattern = "started"
+        depends_on = ("dep_base",)
+
+        @property
+        def args(self):
+            # evaluated when the process is about to be started
+            assert self.process.getinfo("dep_base").isrunning()
+            return [
+                sys.executable,
+                "-c",
+                "print('started', flush=True); import time; time.sleep(60)",
+            ]
+
+    results = xprocess.ensure_all(
+        {"dep_top": Dependent, "dep_base": make_starter(0.5)}, restart=True
+    )
+    assert set(results) == {"dep_top", "dep_base"}
+    for name in results:
+        xprocess.getinfo(name).terminate()
+
+
+def test_dependency_cycle(xprocess, make_starter):
+    starters = {
+        "cycle_a": make_starter(0, depends_on=("cycle_b",)),
+        "cycle_b": make_starter(0, depends_on=("cycle_a",)),
+    }
+    with pytest.raises(ValueError, match="cycle"):
+        xprocess.ensure_all(starters)
+    assert not xprocess.getinfo("cycle_a").isrunning()
+
+
+def test_unknown_dependency(xprocess, make_starter):
+    # left by older versions
+    shutil.rmtree(str(xprocess.rootdir.join("missing_dep")), ignore_errors=True)
+    with pytest.raises(ValueError, match="missing_dep"):
+        xprocess.ensure_all({"orphan": make_starter(0, depends_on=("missing_dep",))})
+    # validation does not leave control directories behind
+    assert not xprocess.rootdir.join("missing_dep").check()
@@ -0,0 +1,76 @@
+import re
+import threading
+import time
+
+import pytest
+
+# logs "flushed" a little while after being started
+FLUSH = (
+    "import sys, time; print('run', sys.argv[1], flush=True); "
+    "print('started', flush=True); time.sleep(0.3); "
+    "print('flushed', flush=True); time.sleep(60)"
+)
+
+
+def log(info, text):
+    with open(str(info.logpath), "a") as f:
+        f.write(text)
+
+
+def test_expect(xprocess, make_starter):
+    xprocess.ensure("expect", make_starter("1", script=FLUSH), restart=True)
+    info = xprocess.getinfo("expect")
+    # waits for the process to log it
+    assert xprocess.expect("expect", "flush(ed)").group(1) == "ed"
+
+    log(info, "replica 1 caught up\nreplica 2 caught up\n")
+    assert xprocess.expect("expect", r"replica (\d)").group(1) == "1"
+    assert xprocess.expect("expect", r"replica (\d)").group(1) == "2"
+    # lines are only matched once, and only after startup was detected
+    for pattern in ("replica", "started", "run 1"):
+        with pytest.raises(TimeoutError, match=repr(pattern)):
+            xprocess.expect("expect", pattern, timeout=0.2)
+
+    timer = threading.Timer(0.2, log, (info, "replica 3 caught up\n"))
+    timer.start()
+    start = time.monotonic()
+    assert xprocess.expect("expect", r"replica (\d)").group(1) == "3"
+    assert time.monotonic() - start < 5
+    timer.join()
+
+    # restarting resets where expectations start
+    xprocess.ensure("expect", make_starter("2", script=FLUSH), restart=True)
+    assert xprocess.expect("expect", "flushed")
+    info.terminate()
+
+
+def test_info_expect_starts_at_newest_block(xprocess, make_starter):
+    for run in ("1", "2"):
+        xprocess.ensure("expect_info", make_starter(run, script=FLUSH), restart=True)
+    info = xprocess.getinfo("expect_info")
+    assert info.expect("run 2")
+    assert info.expect("flushed")
+    # the previous run is never searched
+    with pytest.raises(TimeoutError):
+        xprocess.getinfo("expect_info").expect("run 1", timeout=0.1)
+
+    # incomplete lines are only searched once complete
+    log(info, "replica 1")
+    timer = threading.Timer(0.2, log, (info, "2 caught up\n"))
+    timer.start()
+    assert info.expect(r"replica (\d+)").group(1) == "12"
+    timer.join()
+    # or once the process has exited
+    log(info, "stopping")
+    info.terminate()
+    assert info.expect("stopping")
+
+
+def test_expect_non_ascii(xprocess, make_starter):
+    xprocess.ensure("expect_non_ascii", make_starter("1", script=FLUSH), restart=True)
+    info = xprocess.getinfo("expect_non_ascii")
+    log(info, "serveur prêt\nà bientôt\n")
+    # str patterns keep their meaning on non-ASCII text
+    assert xprocess.expect("expect_non_ascii", r"pr\wt").group(0) == "prêt"
+    assert xprocess.expect("expect_non_ascii", re.compile("À", re.IGNORECASE))
+    info.terminate()
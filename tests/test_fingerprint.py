@@ -0,0 +1,57 @@
+import io
+import json
+
+from _pytest._io import TerminalWriter
+
+
+def test_restart_on_configuration_change(xprocess, make_starter):
+    name = "fingerprint"
+    pid, _ = xprocess.ensure(name, make_starter(0), restart=True)
+
+    result = xprocess.ensure(name, make_starter(0))
+    assert result.pid == pid
+    assert result.decision == "reused"
+
+    result = xprocess.ensure(name, make_starter(0, env={"SPAM": "eggs"}))
+    assert result.pid != pid
+    assert result.decision == "restarted (configuration changed)"
+    pid = result.pid
+    assert xprocess.ensure(name, make_starter(0, env={"SPAM": "eggs"})).pid == pid
+
+    # processes started by older versions are reused
+    info = xprocess.getinfo(name)
+    state = info.read_state()
+    del state["fingerprint"]
+    info.statepath.write(json.dumps(state))
+    result = xprocess.ensure(name, make_starter(0))
+    assert result.pid == pid
+    assert result.decision == "reused (no fingerprint recorded)"
+
+    out = io.StringIO()
+    xprocess._xshow(TerminalWriter(out))
+    assert f"{pid} {name} LIVE" in out.getvalue()
+    assert out.getvalue().count("reused (no fingerprint recorded)") == 1
+    info.terminate()
+
+
+def test_fingerprint(make_starter):
+    starter = make_starter(0)(None, None)
+    other = make_starter(0, env={"SPAM": "1"})(None, None)
+    assert starter.fingerprint() == make_starter(0)(None, None).fingerprint()
+    assert starter.fingerprint() != other.fingerprint()
+
+
+def test_fingerprint_is_stable(make_starter):
+    def make(worker, **popen_kwargs):
+        def preexec():
+            pass
+
+        env = {"PYTEST_XDIST_WORKER": worker, "SPAM": "eggs"}
+        starter = make_starter(0, env=env)(None, None)
+        starter.popen_kwargs = dict(preexec_fn=preexec, **popen_kwargs)
+        return starter.fingerprint()
+
+    # volatile environment variables are left out, and callables are
+    # compared by name rather than by memory address
+    assert make("gw0") == make("gw1")
+    assert make("gw0") != make("gw0", cwd="/")
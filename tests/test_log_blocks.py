@@ -0,0 +1,54 @@
+from xprocess.logs import BLOCK_DELIMITER_LINE
+from xprocess.logs import LogBlockIndex
+
+
+def test_log_handle_starts_at_newest_block(xprocess, request, make_starter):
+    name = "log_blocks"
+    for run in ("1", "2", "3"):
+        xprocess.ensure(name, make_starter(0, run), restart=True)
+    info = xprocess.getinfo(name)
+    index = LogBlockIndex(info.logpath).refresh()
+    content = info.logpath.read_binary()
+    assert len(index.offsets) == content.count(BLOCK_DELIMITER_LINE) >= 3
+    assert content[index.last_block_start :] == b"started 3\n"
+
+    # the handle used for per test log sections only sees the newest block
+    logfile = request.config._extlogfiles[name]
+    logfile.seek(index.last_block_start)
+    assert logfile.read() == "started 3\n"
+    info.terminate()
+
+
+def test_index_rebuilt_when_missing_or_stale(tmp_path):
+    logpath = tmp_path / "xprocess.log"
+    logpath.write_bytes(
+        b"x" * 10 + BLOCK_DELIMITER_LINE + b"spam\n" + BLOCK_DELIMITER_LINE
+    )
+    index = LogBlockIndex(logpath)
+    index.chunk_size = 7  # make delimiters span chunk boundaries
+    assert index.refresh().offsets == [10, 10 + len(BLOCK_DELIMITER_LINE) + 5]
+
+    # only appended data is scanned
+    with open(logpath, "ab") as f:
+        f.write(b"eggs\n" + BLOCK_DELIMITER_LINE)
+    assert len(index.refresh().offsets) == 3
+    assert index.size == logpath.stat().st_size
+
+    # missing index
+    (tmp_path / "xprocess.log.idx").unlink()
+    assert len(LogBlockIndex(logpath).refresh().offsets) == 3
+
+    # truncated log
+    logpath.write_bytes(b"bacon\n" + BLOCK_DELIMITER_LINE)
+    assert LogBlockIndex(logpath).refresh().offsets == [6]
+
+
+def test_append(tmp_path):
+    logpath = tmp_path / "xprocess.log"
+    logpath.write_bytes(b"spam\n")
+    index = LogBlockIndex(logpath).refresh()
+    with open(logpath, "ab") as f:
+        f.write(BLOCK_DELIMITER_LINE)
+    index.append(5)
+    assert LogBlockIndex(logpath).refresh().offsets == [5]
+    assert index.last_block_start == logpath.stat().st_size
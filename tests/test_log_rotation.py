@@ -0,0 +1,91 @@
+import gzip
+import io
+import os
+
+import pytest
+from _pytest._io import TerminalWriter
+
+from xprocess.logs import archived_logs
+from xprocess.logs import BLOCK_DELIMITER_LINE
+from xprocess.logs import format_size
+from xprocess.logs import rotate_log
+
+
+def remove_logs(info):
+    # logs are kept across test runs
+    for path in [str(info.logpath), *archived_logs(info.logpath)]:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def test_rotate_by_blocks(xprocess, make_starter):
+    name = "log_rotation_blocks"
+    remove_logs(xprocess.getinfo(name))
+    settings = dict(log_max_blocks=2, log_backup_count=2, log_compression="gzip")
+    for run in "12345":
+        xprocess.ensure(name, make_starter(0, run, **settings), restart=True)
+    info = xprocess.getinfo(name)
+    # the log is rotated as a whole, archives start at a block delimiter
+    assert info.logpath.read_binary() == BLOCK_DELIMITER_LINE + b"started 5\n"
+    archives = archived_logs(info.logpath)
+    assert [a.rsplit("/", 1)[-1] for a in archives] == [
+        "xprocess.log.1.gz",
+        "xprocess.log.2.gz",
+    ]
+    with gzip.open(archives[0]) as f:
+        assert f.read() == b"".join(
+            BLOCK_DELIMITER_LINE + b"started %d\n" % run for run in (3, 4)
+        )
+    info.terminate()
+
+
+def test_rotate_by_size(xprocess, make_starter):
+    name = "log_rotation_size"
+    remove_logs(xprocess.getinfo(name))
+    xprocess.ensure(name, make_starter(0, 1, log_max_bytes=1), restart=True)
+    xprocess.ensure(name, make_starter(0, 2, log_max_bytes=1), restart=True)
+    info = xprocess.getinfo(name)
+    assert info.logpath.read_binary() == BLOCK_DELIMITER_LINE + b"started 2\n"
+    (archive,) = archived_logs(info.logpath)
+    assert archive.endswith("xprocess.log.1")
+
+    out = io.StringIO()
+    xprocess._xshow(TerminalWriter(out))
+    line = next(line for line in out.getvalue().splitlines() if name in line)
+    size = len(BLOCK_DELIMITER_LINE + b"started 2\n")
+    assert f"xprocess.log {size} B (+1 archived, {size} B)" in line
+    info.terminate()
+
+
+def test_rotate_log(tmp_path):
+    logpath = tmp_path / "xprocess.log"
+    for run in range(3):
+        logpath.write_bytes(b"spam %d\n" % run)
+        rotate_log(logpath, backup_count=2, compression="bz2" if run else None)
+    assert not logpath.exists()
+    assert [p.rsplit("/", 1)[-1] for p in archived_logs(logpath)] == [
+        "xprocess.log.1.bz2",
+        "xprocess.log.2.bz2",
+    ]
+
+    logpath.write_bytes(b"eggs\n")
+    assert rotate_log(logpath, backup_count=0) is None
+    assert not logpath.exists()
+    assert archived_logs(logpath) == []
+
+    with pytest.raises(ValueError, match="unsupported log compression"):
+        rotate_log(logpath, backup_count=1, compression="rar")
+
+
+def test_unsupported_compression(xprocess, make_starter):
+    starter = make_starter(0, log_max_bytes=1, log_compression="rar")
+    # reported before anything is started, not at the first rotation
+    with pytest.raises(ValueError, match="unsupported log compression"):
+        xprocess.ensure("log_rotation_rar", starter, restart=True)
+    assert not xprocess.getinfo("log_rotation_rar").isrunning()
+
+
+def test_format_size():
+    assert format_size(12) == "12 B"
+    assert format_size(1536) == "1.5 KiB"
+    assert format_size(3 * 1024**3) == "3.0 GiB"
@@ -0,0 +1,142 @@
+import asyncio
+import re
+import sys
+
+import pytest
+
+from xprocess import AsyncProcessStarter
+from xprocess import ProcessStarter
+from xprocess import StartupError
+from xprocess.scanning import LogScanner
+
+# a chatty process, logging a banner before it is started
+BANNER = """
+import sys, time
+for n in range(int(sys.argv[1])):
+    print("banner line", n)
+print("server started")
+print("after started", flush=True)
+time.sleep(60)
+"""
+
+
+def feed_bytewise(scanner, data):
+    for n in range(len(data)):
+        found = scanner.feed(data[n : n + 1])
+        if found is not None:
+            return found
+    return scanner.feed(b"", final=True)
+
+
+def test_match_across_chunk_boundaries():
+    log = b"spam\nbacon started eggs\nafter\n"
+    found = feed_bytewise(LogScanner("started"), log)
+    assert found.line == b"bacon started eggs\n"
+    assert log[found.end :] == b"after\n"
+    assert found.error_pattern is None
+
+    # ^ and $ match at the start and end of every line
+    scanner = LogScanner(re.compile("^STARTED$", re.IGNORECASE))
+    assert scanner.feed(b"not started\nstarted\n").line == b"started\n"
+    assert LogScanner("spam").feed(b"eggs\n") is None
+
+
+def test_incomplete_lines():
+    scanner = LogScanner("started")
+    # only searched when final, and kept for later
+    assert scanner.feed(b"spam\nnot yet sta") is None
+    assert scanner.feed(b"", final=True) is None
+    found = scanner.feed(b"rted\n")
+    assert found.line == b"not yet started\n"
+    assert found.end == 21
+    assert LogScanner("started").feed(b"started", final=True).end == 7
+
+
+def test_error_patterns():
+    scanner = LogScanner("started", ["error", "fatal"])
+    found = scanner.feed(b"fatal: no\nerror\nstarted\n")
+    assert found.line == b"fatal: no\n"
+    assert found.error_pattern.pattern == b"fatal"
+    # errors on the matching line win, later ones are ignored
+    scanner = LogScanner("started", ["error"])
+    assert scanner.feed(b"started with error\n").error_pattern is not None
+    assert (
+        LogScanner("started", ["error"]).feed(b"started\nerror\n").error_pattern is None
+    )
+
+
+@pytest.mark.parametrize(
+    "limits", [{"max_read_bytes": 10**7}, {"max_read_lines": None}]
+)
+def test_chatty_process(xprocess, request, limits):
+    class Starter(ProcessStarter):
+        pattern = "server started$"
+        args = [sys.executable, "-c", BANNER, "20000"]
+        read_chunk_size = 4096
+
+    for name, value in limits.items():
+        setattr(Starter, name, value)
+    xprocess.ensure("log_scanning", Starter, restart=True)
+    # the log handle is left after the matching line
+    logfile = request.config._extlogfiles["log_scanning"]
+    assert logfile.readline() == "after started\n"
+    xprocess.getinfo("log_scanning").terminate()
+
+
+def test_max_read_bytes(xprocess):
+    class Starter(ProcessStarter):
+        pattern = "server started"
+        args = [sys.executable, "-c", BANNER, "1000"]
+        max_read_bytes = 100
+
+    with pytest.raises(RuntimeError, match="not found within 100 bytes"):
+        xprocess.ensure("log_scanning_limit", Starter, restart=True)
+    xprocess.getinfo("log_scanning_limit").terminate()
+
+
+def test_error_pattern_while_scanning(xprocess):
+    class Starter(ProcessStarter):
+        pattern = "server started"
+        error_pattern = "banner line 500$"
+        args = [sys.executable, "-c", BANNER, "1000"]
+        max_read_lines = None
+
+    with pytest.raises(StartupError, match="'banner line 500\\$' matched"):
+        xprocess.ensure("log_scanning_error", Starter, restart=True)
+    xprocess.getinfo("log_scanning_error").terminate()
+
+
+def test_async_scanning(xprocess):
+    class Starter(AsyncProcessStarter):
+        pattern = "server started"
+        args = [sys.executable, "-c", BANNER, "5000"]
+        max_read_lines = None
+
+    asyncio.run(xprocess.aensure("log_scanning_async", Starter, restart=True))
+    xprocess.getinfo("log_scanning_async").terminate()
+
+
+# writes "server started" and the rest of its line in two flushes
+TWO_FLUSHES = """
+import sys, time
+sys.stdout.write("server started"); sys.stdout.flush()
+time.sleep(0.5)
+print(" after all", flush=True)
+print("server started", flush=True)
+time.sleep(60)
+"""
+
+
+def test_line_written_in_two_flushes(xprocess, request):
+    class Starter(ProcessStarter):
+        pattern = "^server started$"
+        args = [sys.executable, "-c", TWO_FLUSHES]
+        max_read_lines = None
+
+    xprocess.ensure("log_scanning_flushes", Starter, restart=True)
+    # the first line did not match once complete, the second one did
+    logfile = request.config._extlogfiles["log_scanning_flushes"]
+    assert logfile.read() == ""
+    log = xprocess.getinfo("log_scanning_flushes").logpath.read()
+    assert log.endswith("server started after all\nserver started\n")
+    xprocess.getinfo("log_scanning_flushes").terminate()
@@ -0,0 +1,66 @@
+def test_failed_reports_get_log_sections(testdir):
+    testdir.makeini(
+        """
+        [pytest]
+        xprocess_log_tail_bytes = 50
+    """
+    )
+    testdir.makepyfile(
+        """
+        import sys
+        import pytest
+        from xprocess import ProcessStarter
+
+        @pytest.fixture(scope="module")
+        def server(xprocess):
+            class Starter(ProcessStarter):
+                pattern = "started"
+                args = [
+                    sys.executable,
+                    "-c",
+                    "print('started', flush=True); import time; time.sleep(60)",
+                ]
+
+            xprocess.ensure("log_sections", Starter, restart=True)
+            info = xprocess.getinfo("log_sections")
+            yield info
+            info.terminate()
+
+        def log(info, text):
+            with open(str(info.logpath), "a") as f:
+                f.write(text)
+
+        def test_first(server):
+            log(server, "first test output\\n")
+            assert 0
+
+        def test_passing(server):
+            log(server, "passing test output\\n")
+
+        def test_failing(server):
+            log(server, "failing test output\\n")
+            assert 0
+
+        def test_chatty(server):
+            log(server, "x" * 100 + "\\n" + "last line\\n")
+            assert 0
+    """
+    )
+    result = testdir.runpytest()
+    result.assert_outcomes(passed=1, failed=3)
+    result.stdout.fnmatch_lines(
+        [
+            "*_ test_first _*",
+            "*- log_sections log -*",
+            "first test output",
+            "*_ test_failing _*",
+            "*- log_sections log -*",
+            "failing test output",
+            "*_ test_chatty _*",
+            "*- log_sections log -*",
+            "[[]* B skipped, full log at *xprocess.log]",
+            "last line",
+        ]
+    )
+    result.stdout.no_fnmatch_line("passing test output")
+    result.stdout.no_fnmatch_line("xxxx*")
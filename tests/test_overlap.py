@@ -0,0 +1,67 @@
+import psutil
+import pytest
+
+from xprocess import StartupError
+from xprocess import XProcess
+
+# takes a while to stop once terminated
+SLOW_STOP = """
+import signal, sys, time
+if sys.argv[1] == "fail":
+    sys.exit(1)
+signal.signal(signal.SIGTERM, lambda *args: (time.sleep(2), sys.exit(0)))
+print("started", flush=True)
+while True:
+    time.sleep(1)
+"""
+
+
+@pytest.fixture
+def overlapping(make_starter):
+    def overlapping(mode="ok"):
+        return make_starter(mode, script=SLOW_STOP, restart_overlap=True)
+
+    return overlapping
+
+
+def test_overlapped_restart(request, xprocess, overlapping):
+    with XProcess(request.config, xprocess.rootdir) as xproc:
+        old_pid = xproc.ensure("overlap", overlapping(), restart=True).pid
+        result = xproc.ensure("overlap", overlapping(), restart=True)
+        assert result.decision == "restarted"
+        assert result.pid != old_pid
+        assert xproc.getinfo("overlap").pid == result.pid
+        # the replaced instance is still stopping
+        assert psutil.pid_exists(old_pid)
+        logfile = request.config._extlogfiles["overlap"]
+    # terminated in the background, and waited for once done
+    assert not psutil.pid_exists(old_pid)
+    info = xprocess.getinfo("overlap")
+    assert info.isrunning()
+    assert logfile is xprocess.config._extlogfiles["overlap"]
+    info.terminate()
+
+
+def test_overlapped_restart_failure(xprocess, overlapping):
+    old_pid = xprocess.ensure("overlap_failure", overlapping(), restart=True).pid
+    with pytest.raises(StartupError):
+        xprocess.ensure("overlap_failure", overlapping("fail"))
+    # the previous instance is left in place
+    info = xprocess.getinfo("overlap_failure")
+    assert info.pid == old_pid
+    assert info.isrunning()
+    info.terminate()
+
+
+def test_overlapped_restart_keeps_log(request, xprocess, overlapping):
+    with XProcess(request.config, xprocess.rootdir) as xproc:
+        xproc.ensure("overlap_log", overlapping(), restart=True)
+        logpath = xproc.getinfo("overlap_log").logpath
+        before = logpath.read()
+        xproc.ensure("overlap_log", overlapping(), restart=True, persist_logs=False)
+        # not truncated while the replaced instance still writes to it
+        log = logpath.read()
+        assert log.startswith(before)
+        assert "started" in log[len(before) :]
+        assert request.config._extlogfiles["overlap_log"].read() == ""
+    xprocess.getinfo("overlap_log").terminate()
@@ -0,0 +1,112 @@
+import json
+import re
+import sys
+
+import pytest
+
+from xprocess import ProcessStarter
+from xprocess.matching import PatternSet
+
+# logs readiness events in a random order, some of them as JSON lines
+EVENTS = """
+import json, random, sys, time
+events = [
+    "db connected",
+    json.dumps({"level": "info", "event": "cache warmed", "entries": 3}),
+    "listening on port 1234",
+]
+random.shuffle(events)
+for event in events:
+    print("noise", flush=True)
+    print(event, flush=True)
+    time.sleep(0.05)
+time.sleep(60)
+"""
+
+
+def test_all_patterns():
+    patterns = PatternSet(["db connected", {"event": "cache warmed"}])
+    assert not patterns.match("spam\n")
+    assert not patterns.match('{"event": "cache cold"}\n')
+    assert not patterns.match("db connected\n")
+    assert patterns.match('{"event": "cache warmed", "n": 1}\n')
+    first, second = patterns.events
+    assert first.pattern == "db connected"
+    assert first.line == "db connected"
+    assert first.fields is None
+    assert second.fields == {"event": "cache warmed", "n": 1}
+    assert first.time <= second.time
+
+
+def test_any_pattern():
+    patterns = PatternSet([re.compile("READY", re.IGNORECASE), "up"], mode="any")
+    assert patterns.match("ready\n")
+    assert [event.pattern.pattern for event in patterns.events] == ["READY"]
+    with pytest.raises(ValueError, match="mode"):
+        PatternSet(["a"], mode="some")
+
+
+def test_json_fields():
+    patterns = PatternSet([{"status": 200, "ok": True}])
+    # the combined regex only lets lines mentioning the first key through
+    assert patterns.source == '(?:"status")'
+    assert not patterns.match("status: 200\n")
+    assert not patterns.match('{"status": 200, "ok": false}\n')
+    assert not patterns.match('["status", 200]\n')
+    assert patterns.match('  {"status": 200, "ok": true}\n')
+
+
+def test_json_escaped_values():
+    line = json.dumps({"msg": "café prêt", "tags": "a&b"}) + "\n"
+    # python's json escapes non-ASCII characters by default, go's "&"
+    assert "\\u00e9" in line
+    go_line = line.replace("&", "\\u0026")
+    assert PatternSet([{"msg": "café prêt"}]).match(line)
+    assert PatternSet([{"tags": "a&b"}]).match(go_line)
+    # keys which may be escaped too are not part of the combined regex
+    patterns = PatternSet([{"état": "prêt"}])
+    assert patterns.source == r"(?:\{)"
+    assert patterns.match(json.dumps({"état": "prêt"}) + "\n")
+
+
+def test_combined_regex_fallback():
+    # global flags are only allowed at the start of a regex
+    patterns = PatternSet(["spam", "(?i)eggs"])
+    assert patterns.source is None
+    assert not patterns.match("EGGS\n")
+    assert patterns.match("spam\n")
+
+
+@pytest.mark.parametrize("max_read_lines", [50, None])
+def test_ensure_events(xprocess, max_read_lines):
+    class Starter(ProcessStarter):
+        args = [sys.executable, "-c", EVENTS]
+        patterns = ["db connected", {"event": "cache warmed"}, r"listening on port \d+"]
+
+    Starter.max_read_lines = max_read_lines
+    result = xprocess.ensure("patterns", Starter, restart=True)
+    assert len(result.events) == 3
+    assert {str(event.pattern) for event in result.events} == {
+        "db connected",
+        "{'event': 'cache warmed'}",
+        r"listening on port \d+",
+    }
+    times = [event.time for event in result.events]
+    assert times == sorted(times)
+
+    # nothing to wait for when the process is reused
+    assert xprocess.ensure("patterns", Starter).events == []
+    xprocess.getinfo("patterns").terminate()
+
+
+def test_ensure_any_with_pattern(xprocess):
+    class Starter(ProcessStarter):
+        pattern = "will not match"
+        args = [sys.executable, "-c", EVENTS]
+        patterns = ["db connected", "listening"]
+        patterns_mode = "any"
+
+    result = xprocess.ensure("patterns_any", Starter, restart=True)
+    [event] = result.events
+    assert event.pattern in ("db connected", "listening")
+    xprocess.getinfo("patterns_any").terminate()
@@ -0,0 +1,73 @@
+import sys
+
+import psutil
+import pytest
+
+from xprocess import ProcessStarter
+from xprocess import StartupError
+
+
+class Starter(ProcessStarter):
+    pattern = "started"
+    args = [
+        sys.executable,
+        "-c",
+        "print('started', flush=True); import time; time.sleep(60)",
+    ]
+
+
+def test_pool_leases(xprocess):
+    pool = xprocess.pool("pool", Starter, size=2)
+    first, second = pool.lease(), pool.lease()
+    assert {first.name, second.name} == {"pool-pool-0", "pool-pool-1"}
+    assert first.info.isrunning() and second.info.isrunning()
+    assert first.pid != second.pid
+    with pytest.raises(TimeoutError):
+        pool.lease(timeout=0.1)
+
+    # handed back instances are restarted
+    pid = first.pid
+    first.release()
+    with pool.lease() as lease:
+        assert lease.name == first.name
+        assert lease.pid != pid
+        assert lease.info.isrunning()
+
+    # or reused as they are
+    second.release(recycle=True)
+    with pool.lease(timeout=1) as lease:
+        assert lease.name == second.name
+        assert lease.pid == second.pid
+
+    leased = pool.lease()
+    pool.close()
+    assert not leased.info.isrunning()
+    assert not any(xprocess.getinfo(name).isrunning() for name in pool.names)
+    with pytest.raises(RuntimeError):
+        pool.lease()
+
+
+def test_pool_startup_failure(xprocess):
+    class Failing(ProcessStarter):
+        pattern = "started"
+        args = [sys.executable, "-c", "raise SystemExit(3)"]
+
+    pool = xprocess.pool("failing_pool", Failing)
+    with pytest.raises(StartupError) as excinfo:
+        pool.lease()
+    assert excinfo.value.returncode == 3
+    pool.close()
+
+
+def test_pool_releases_replaced_resources(xprocess):
+    pool = xprocess.pool("cycled_pool", Starter, size=1)
+    (instance,) = pool.names
+    pool.lease().release(recycle=True)
+    fds = psutil.Process().num_fds()
+    for _ in range(10):
+        pool.lease().release()
+    pool.lease().release(recycle=True)
+    # only the resources of the running instance are kept
+    assert [r.name for r in xprocess.resources].count(instance) == 1
+    assert psutil.Process().num_fds() == fds
+    pool.close()
@@ -0,0 +1,137 @@
+import sys
+import time
+
+import psutil
+import pytest
+
+from xprocess import ProcessStarter
+
+STARTED = "print('started', flush=True); import time; time.sleep(60)"
+
+
+def test_prestart(xprocess, make_starter):
+    first, second = make_starter(0.5), make_starter(0.1, depends_on=["prestart-1"])
+    xprocess.prestart({"prestart-2": second, "prestart-1": first})
+    time.sleep(1)
+    ensured = time.time()
+    result = xprocess.ensure("prestart-2", second)
+    assert result.decision == "started"
+    # startup happened in the background, before ensure was called
+    assert xprocess.getinfo("prestart-2").read_state()["create_time"] < ensured
+    # dependencies are started first
+    started = [
+        xprocess.getinfo(name).read_state()["create_time"]
+        for name in ("prestart-1", "prestart-2")
+    ]
+    assert started == sorted(started)
+
+    # just started, restart=True does not restart it again
+    assert xprocess.ensure("prestart-1", first, restart=True).decision == "started"
+    assert xprocess.ensure("prestart-1", first).decision == "reused"
+    xprocess.getinfo("prestart-1").terminate()
+    xprocess.getinfo("prestart-2").terminate()
+
+
+def test_prestart_error_raised_by_ensure(xprocess):
+    class Failing(ProcessStarter):
+        pattern = "started"
+        args = [sys.executable, "-c", "raise SystemExit(3)"]
+
+    xprocess.prestart({"prestart-failing": Failing})
+    with pytest.raises(RuntimeError, match="exited with code 3"):
+        xprocess.ensure("prestart-failing", Failing)
+
+
+def test_cancel_prestart(xprocess, make_starter):
+    info = xprocess.getinfo("prestart-unneeded")
+    info.terminate()
+    xprocess.prestart(
+        {
+            "prestart-needed": make_starter(0, depends_on=["prestart-dep"]),
+            "prestart-dep": make_starter(0),
+            "prestart-unneeded": make_starter(0.2),
+        }
+    )
+    xprocess.cancel_prestart(keep=["prestart-needed"])
+    assert set(xprocess._prestarted) == {"prestart-needed", "prestart-dep"}
+    # started in the background already, terminated once ready
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        info = xprocess.getinfo("prestart-unneeded")
+        if info.pid and not info.isrunning():
+            break
+        time.sleep(0.1)
+    assert info.pid and not info.isrunning()
+    for name in ("prestart-needed", "prestart-dep"):
+        xprocess._prestarted[name][1].result()
+        xprocess.getinfo(name).terminate()
+
+
+def test_declared_processes(testdir):
+    testdir.makeconftest(
+        f"""
+        import sys
+        import pytest
+        from xprocess import ProcessStarter
+
+        class Starter(ProcessStarter):
+            pattern = "started"
+            args = [sys.executable, "-c", {STARTED!r}]
+
+        def pytest_xprocess_declare(config):
+            return {{"declared-hook": Starter}}
+    """
+    )
+    testdir.makepyfile(
+        starters=f"""
+        import sys
+        from xprocess import ProcessStarter
+
+        class Starter(ProcessStarter):
+            pattern = "started"
+            args = [sys.executable, "-c", {STARTED!r}]
+        """
+    )
+    testdir.makeini(
+        """
+        [pytest]
+        xprocess_prestart =
+            declared-ini = starters:Starter
+            declared-unused = starters:Starter
+    """
+    )
+    testdir.makepyfile(
+        """
+        import pytest
+        import conftest
+        import starters
+
+        @pytest.mark.xprocess("declared-hook", "declared-ini")
+        def test_declared(xprocess):
+            hook = xprocess.ensure("declared-hook", conftest.Starter)
+            ini = xprocess.ensure("declared-ini", starters.Starter)
+            assert hook.decision == ini.decision == "started"
+            assert "declared-unused" not in xprocess._prestarted
+            xprocess.getinfo("declared-hook").terminate()
+            xprocess.getinfo("declared-ini").terminate()
+    """
+    )
+    result = testdir.runpytest("--strict-markers")
+    result.assert_outcomes(passed=1)
+    pidpath = testdir.tmpdir.join(
+        ".pytest_cache/d/.xprocess/declared-unused/xprocess.PID"
+    )
+    # unused processes are not running by the end of the session
+    if pidpath.check():
+        assert not psutil.pid_exists(int(pidpath.read()))
+
+
+def test_invalid_prestart_line(testdir):
+    testdir.makeini(
+        """
+        [pytest]
+        xprocess_prestart = nope
+    """
+    )
+    result = testdir.runpytest()
+    result.stderr.fnmatch_lines(["*invalid xprocess_prestart line 'nope'*"])
@@ -0,0 +1,126 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from xprocess import FileExistsReady
+from xprocess import HTTPReady
+from xprocess import Probe
+from xprocess import ProcessStarter
+from xprocess import TCPPortReady
+from xprocess import UnixSocketReady
+
+server_path = Path(__file__).parent.joinpath("server.py").absolute()
+
+UNIX_SERVER = """
+import socket, sys, time
+time.sleep(0.3)
+sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+sock.bind(sys.argv[1])
+sock.listen()
+time.sleep(60)
+"""
+
+TOUCH_LATER = "import time; time.sleep(0.3); open('ready', 'w').close(); time.sleep(60)"
+
+
+def test_tcp_port_probe(xprocess, tcp_port):
+    probe = TCPPortReady(tcp_port)
+
+    class Starter(ProcessStarter):
+        probes = [probe]
+        args = [sys.executable, server_path, tcp_port, "--no-children"]
+
+    result = xprocess.ensure("tcp_probe", Starter, restart=True)
+    info = xprocess.getinfo("tcp_probe")
+    assert info.isrunning()
+    # each wait has its own copy of the probes declared on the class
+    [waited] = result.probes
+    assert waited is not probe and not probe.attempts
+    assert waited.port == tcp_port
+    assert waited.attempts[-1].ok
+    assert all(attempt.duration >= 0 for attempt in waited.attempts)
+    info.terminate()
+
+
+def test_probes_run_along_pattern(xprocess, tcp_port):
+    class Starter(ProcessStarter):
+        pattern = "started"
+        probes = [TCPPortReady(tcp_port)]
+        args = [sys.executable, server_path, tcp_port, "--no-children"]
+
+    xprocess.ensure("pattern_probe", Starter)
+    info = xprocess.getinfo("pattern_probe")
+    assert info.isrunning()
+    info.terminate()
+
+
+def test_http_probe(xprocess, tcp_port):
+    probe = HTTPReady(tcp_port, "/", status=200, host="127.0.0.1")
+
+    class Starter(ProcessStarter):
+        probes = [probe]
+        args = [sys.executable, "-m", "http.server", tcp_port, "--bind", "127.0.0.1"]
+
+    result = xprocess.ensure("http_probe", Starter, restart=True)
+    assert result.probes[0].attempts[-1].ok
+    xprocess.getinfo("http_probe").terminate()
+
+
+def test_file_exists_probe(xprocess):
+    class Starter(ProcessStarter):
+        args = [sys.executable, "-c", TOUCH_LATER]
+
+        @property
+        def probes(self):
+            return [FileExistsReady(self.control_dir.join("ready"))]
+
+    xprocess.ensure("file_probe", Starter)
+    info = xprocess.getinfo("file_probe")
+    assert info.controldir.join("ready").check()
+    info.terminate()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="no unix sockets on windows")
+def test_unix_socket_probe(xprocess, tmp_path):
+    path = tmp_path / "probe.sock"
+
+    class Starter(ProcessStarter):
+        probes = [UnixSocketReady(path)]
+        args = [sys.executable, "-c", UNIX_SERVER, path]
+
+    xprocess.ensure("unix_probe", Starter)
+    xprocess.getinfo("unix_probe").terminate()
+
+
+def test_probe_timeout(xprocess, tcp_port):
+    class Starter(ProcessStarter):
+        timeout = 1
+        probes = [TCPPortReady(tcp_port)]
+        args = [sys.executable, "-c", "import time; time.sleep(60)"]
+
+    with pytest.raises(TimeoutError, match="TCPPortReady"):
+        xprocess.ensure("probe_timeout", Starter)
+    xprocess.getinfo("probe_timeout").terminate()
+
+
+def test_backoff():
+    class EventuallyReady(Probe):
+        initial_delay = 0.01
+        max_delay = 0.04
+
+        def __init__(self):
+            super().__init__()
+            self.calls = 0
+
+        def check(self):
+            self.calls += 1
+            if self.calls < 6:
+                raise ConnectionRefusedError
+            return True
+
+    probe = EventuallyReady()
+    assert probe.wait(10)
+    assert [attempt.ok for attempt in probe.attempts] == [False] * 5 + [True]
+    assert all(isinstance(a.error, ConnectionRefusedError) for a in probe.attempts[:5])
+    assert not EventuallyReady().wait(0)
@@ -1,3 +1,4 @@
+import os
 import sys
 from pathlib import Path
 
@@ -94,3 +95,57 @@ def test_return_value_on_failure(tcp_port, proc_name, xprocess):
         psutil.Process(info.pid).terminate()
     except psutil.NoSuchProcess:
         pass
+
+
+ORPHAN = """
+import subprocess, time
+# the shell exits right away, leaving its sleep child orphaned
+sh = subprocess.Popen(["sh", "-c", "sleep 60 & echo $!"], stdout=subprocess.PIPE)
+orphan = int(sh.stdout.readline())
+sh.wait()
+print("started", orphan, flush=True)
+time.sleep(60)
+"""
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="no process groups on windows")
+def test_terminate_reparented_descendants(xprocess):
+    class Starter(ProcessStarter):
+        pattern = "started"
+        args = [sys.executable, "-c", ORPHAN]
+
+    pid, logpath = xprocess.ensure("orphans", Starter, restart=True)
+    info = xprocess.getinfo("orphans")
+    # processes lead their own process group
+    assert os.getpgid(pid) == pid
+    orphan = int(open(str(logpath)).read().split("started")[-1])
+    assert psutil.Process(orphan).ppid() != pid
+    assert orphan not in [p.pid for p in psutil.Process(pid).children(True)]
+
+    assert info.terminate() == 1
+    try:
+        assert psutil.Process(orphan).status() == psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        pass
+
+
+def test_stale_pid_file(xprocess):
+    class Starter(ProcessStarter):
+        pattern = "started"
+        args = [
+            sys.executable,
+            "-c",
+            "print('started', flush=True); import time; time.sleep(60)",
+        ]
+
+    pid, _ = xprocess.ensure("stale_pid", Starter, restart=True)
+    info = xprocess.getinfo("stale_pid")
+    assert info.isrunning()
+
+    # pretend the PID has been reused by another process since
+    info.write_state(create_time=info.read_state()["create_time"] - 1000)
+    stale = xprocess.getinfo("stale_pid")
+    assert not stale.isrunning()
+    assert stale.terminate() == 0
+    assert psutil.pid_exists(pid)
+    assert info.terminate() == 1
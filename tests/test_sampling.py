@@ -0,0 +1,154 @@
+import json
+import subprocess
+import sys
+
+from xprocess.sampling import ResourceSampler
+
+# allocates 50 MiB in a child process once told to
+ALLOCATE = """
+import subprocess, sys
+child = subprocess.Popen([sys.executable, "-c", '''
+import sys
+sys.stdin.readline()
+ballast = bytearray(50 * 1024 * 1024)
+print("allocated", flush=True)
+sys.stdin.readline()
+'''], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+print(child.pid, flush=True)
+for line in sys.stdin:
+    child.stdin.write(line.encode())
+    child.stdin.flush()
+    sys.stdout.write(child.stdout.readline().decode())
+    sys.stdout.flush()
+"""
+
+
+def test_growth_attributed_to_running_test():
+    proc = subprocess.Popen(
+        [sys.executable, "-c", ALLOCATE],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        child_pid = int(proc.stdout.readline())
+        sampler = ResourceSampler(lambda: {"alloc": proc.pid}, max_samples=3)
+        sampler.test = "test_idle"
+        sampler.sample()
+        sampler.test = "test_alloc"
+        proc.stdin.write("go\n")
+        proc.stdin.flush()
+        assert proc.stdout.readline() == "allocated\n"
+        sampler.sample()
+        sampler.test = None
+        sampler.sample()
+        sampler.sample()
+    finally:
+        proc.kill()
+        proc.wait()
+
+    # the tree is sampled, not only its root
+    assert sampler.samples[-1].pids == [proc.pid, child_pid]
+    assert len(sampler.samples) == 3
+    [top, idle] = sampler.top()
+    assert top.test == "test_alloc"
+    assert top.rss_growth > 40 * 1024 * 1024
+    assert idle.test == "test_idle"
+    assert idle.rss_growth == 0
+    assert top.threads_peak >= 2
+    assert "alloc test_alloc" in sampler.summary()[0]
+
+    # dead processes are skipped
+    sampler.sample()
+    assert len(sampler.usage) == 3
+
+
+def test_sampling_session(testdir):
+    testdir.makepyfile(
+        """
+        import sys
+        import time
+        import pytest
+        from xprocess import ProcessStarter
+
+        @pytest.fixture
+        def server(xprocess):
+            class Starter(ProcessStarter):
+                pattern = "started"
+                args = [
+                    sys.executable,
+                    "-c",
+                    "print('started', flush=True); import time; time.sleep(60)",
+                ]
+
+            xprocess.ensure("sampled", Starter, restart=True)
+            yield
+            xprocess.getinfo("sampled").terminate()
+
+        def test_sampled(server):
+            time.sleep(0.5)
+    """
+    )
+    dump = testdir.tmpdir.join("samples.json")
+    result = testdir.runpytest("--xsample=0.05", f"--xsample-json={dump}")
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(
+        [
+            "*xprocess resource usage*",
+            "rss * peak * cpu *% fds * threads 1 sampled *::test_sampled",
+            "* samples taken every 0.05s, sampling took *s",
+        ]
+    )
+    data = json.loads(dump.read())
+    assert data["interval"] == 0.05
+    assert data["samples"]
+    [usage] = [u for u in data["tests"] if u["test"]]
+    assert usage["test"].endswith("::test_sampled")
+    assert usage["process"] == "sampled"
+    assert usage["samples"] >= 5
+
+
+def test_sampling_disabled_by_default(testdir):
+    testdir.makepyfile(
+        """
+        def test_nothing():
+            pass
+    """
+    )
+    result = testdir.runpytest()
+    result.assert_outcomes(passed=1)
+    assert "xprocess resource usage" not in result.stdout.str()
+
+
+def test_reused_process_is_sampled(testdir):
+    testdir.makepyfile(
+        """
+        import sys
+        import time
+        import pytest
+        from xprocess import ProcessStarter
+
+        @pytest.fixture
+        def server(xprocess, request):
+            class Starter(ProcessStarter):
+                pattern = "started"
+                args = [
+                    sys.executable,
+                    "-c",
+                    "print('started', flush=True); import time; time.sleep(60)",
+                ]
+
+            xprocess.ensure("reused", Starter)
+            yield
+            if request.config.getoption("xsample"):
+                xprocess.getinfo("reused").terminate()
+
+        def test_sampled(server):
+            time.sleep(0.5)
+    """
+    )
+    testdir.runpytest().assert_outcomes(passed=1)
+    # the process started by the previous session is reused
+    result = testdir.runpytest("--xsample=0.05")
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(["rss * reused *::test_sampled"])
@@ -0,0 +1,101 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+from xprocess import AsyncProcessStarter
+from xprocess import ProcessStarter
+from xprocess import XProcess
+from xprocess.notify import NotifySocket
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="sd_notify requires unix sockets"
+)
+
+NOTIFY = """
+import os, socket, time
+address = os.environ["NOTIFY_SOCKET"]
+if address.startswith("@"):
+    address = "\\0" + address[1:]
+sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+sock.sendto(b"STATUS=warming up", address)
+time.sleep(0.3)
+sock.sendto(b"READY=1\\nSTATUS=serving", address)
+while True:
+    time.sleep(0.05)
+    sock.sendto(b"WATCHDOG=1", address)
+"""
+
+
+class NotifyStarter(ProcessStarter):
+    sd_notify = True
+    watchdog_interval = 0.05
+    args = [sys.executable, "-c", NOTIFY]
+
+
+def test_ready_notification(xprocess):
+    xprocess.ensure("notify", NotifyStarter)
+    info = xprocess.getinfo("notify")
+    notify = xprocess.getnotify("notify")
+    assert notify.ready
+    assert notify.status == "serving"
+    log = info.logpath.read()
+    assert "sd_notify STATUS=warming up" in log
+    assert "sd_notify STATUS=serving" in log
+    time.sleep(0.2)
+    assert notify.watchdog_alive(1)
+    info.terminate()
+    time.sleep(0.2)
+    assert not notify.watchdog_alive(0.1)
+
+
+def test_ready_notification_async(xprocess):
+    class Starter(AsyncProcessStarter):
+        sd_notify = True
+        args = [sys.executable, "-c", NOTIFY]
+
+    asyncio.run(xprocess.aensure("notify_async", Starter))
+    assert xprocess.getnotify("notify_async").ready
+    xprocess.getinfo("notify_async").terminate()
+
+
+def test_no_ready_notification(xprocess):
+    class Starter(ProcessStarter):
+        sd_notify = True
+        timeout = 1
+        args = [sys.executable, "-c", "import time; time.sleep(60)"]
+
+    with pytest.raises(TimeoutError, match="READY=1"):
+        xprocess.ensure("notify_timeout", Starter)
+    xprocess.getinfo("notify_timeout").terminate()
+
+
+def test_overlapped_restart(request, xprocess):
+    class Starter(NotifyStarter):
+        restart_overlap = True
+
+    with XProcess(request.config, xprocess.rootdir) as xproc:
+        xproc.ensure("notify_overlap", Starter, restart=True)
+        replaced = xproc.getnotify("notify_overlap")
+        xproc.ensure("notify_overlap", Starter, restart=True)
+        notify = xproc.getnotify("notify_overlap")
+        # each instance notifies through a socket of its own
+        assert notify.address != replaced.address
+        replaced.close()
+        assert os.path.exists(notify.path)
+        time.sleep(0.2)
+        assert notify.watchdog_alive(0.2)
+    xprocess.getinfo("notify_overlap").terminate()
+
+
+def test_socket_path_bound_again(tmp_path):
+    path = tmp_path / "notify.sock"
+    first = NotifySocket(path)
+    second = NotifySocket(path)
+    # the path belongs to the second socket now
+    first.close()
+    assert path.exists()
+    second.close()
+    assert not path.exists()
@@ -0,0 +1,120 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import psutil
+import pytest
+
+from xprocess import ProcessStarter
+from xprocess.locking import FileLock
+
+SLEEP = "print('started', flush=True); import time; time.sleep(60)"
+
+
+def test_file_lock(tmp_path):
+    path = tmp_path / "xprocess.lock"
+    with FileLock(path) as lock:
+        assert lock.locked
+        # locks on the same path exclude each other, even within a process
+        with pytest.raises(TimeoutError):
+            FileLock(path).acquire(timeout=0.1)
+        acquired = threading.Event()
+
+        def acquire():
+            with FileLock(path):
+                acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        assert not acquired.wait(0.2)
+    assert not lock.locked
+    thread.join(5)
+    assert acquired.is_set()
+
+
+def test_sessions_share_process(testdir):
+    # test sessions running concurrently, like pytest-xdist workers
+    testdir.makepyfile(
+        """
+        import sys
+        import time
+        from xprocess import ProcessStarter
+
+        def test_shared(xprocess):
+            class Starter(ProcessStarter):
+                pattern = "started"
+                args = [
+                    sys.executable,
+                    "-c",
+                    "import os, time; "
+                    "open('starts', 'a').write('%d\\\\n' % os.getpid()); "
+                    "time.sleep(0.5); print('started', flush=True); "
+                    "time.sleep(60)",
+                ]
+
+            pid, _ = xprocess.ensure("shared", Starter, restart=True)
+            with open("pids", "a") as f:
+                f.write(f"{pid}\\n")
+            time.sleep(1)
+            xprocess.getinfo("shared").terminate()
+    """
+    )
+    sessions = [
+        subprocess.Popen(
+            [sys.executable, "-m", "pytest", "-q"],
+            cwd=str(testdir.tmpdir),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        for _ in range(3)
+    ]
+    for session in sessions:
+        out, _ = session.communicate(timeout=60)
+        assert session.returncode == 0, out.decode()
+
+    controldir = testdir.tmpdir.join(".pytest_cache", "d", ".xprocess", "shared")
+    # started exactly once, and every session used that process
+    (pid,) = controldir.join("starts").read().split()
+    assert set(testdir.tmpdir.join("pids").read().split()) == {pid}
+    # the last session terminated it
+    assert not psutil.pid_exists(int(pid)) or (
+        psutil.Process(int(pid)).status() == psutil.STATUS_ZOMBIE
+    )
+
+
+def test_process_held_by_other_session(xprocess):
+    class Starter(ProcessStarter):
+        pattern = "started"
+        args = [sys.executable, "-c", SLEEP]
+
+    pid, _ = xprocess.ensure("held", Starter)
+    info = xprocess.getinfo("held")
+    with info.lock():
+        assert list(info.holders()) == [os.getpid()]
+
+    # pretend another test session holds the process
+    with subprocess.Popen([sys.executable, "-c", SLEEP]) as other:
+        create_time = psutil.Process(other.pid).create_time()
+        with info.lock():
+            holders = {**info.holders(), other.pid: create_time}
+        info.holderspath.write(json.dumps(holders))
+
+        # neither restarted nor terminated while the other session holds it
+        assert xprocess.ensure("held", Starter, restart=True).pid == pid
+        assert info.terminate() == 0
+        assert info.isrunning()
+        with info.lock():
+            assert list(info.holders()) == [other.pid]
+        other.kill()
+
+    # holds of dead sessions are ignored
+    with info.lock():
+        assert info.holders() == {}
+    assert info.terminate() == 1
+
+    xprocess.ensure("held", Starter)
+    info = xprocess.getinfo("held")
+    assert info.terminate(force=True) == 1
+    assert not info.holderspath.check()
@@ -0,0 +1,84 @@
+import socket
+import sys
+
+import pytest
+
+from xprocess import ProcessStarter
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="socket activation is not supported on windows"
+)
+
+# echo server using the sockets passed by xprocess, which only boots once
+# told to by the creation of a "boot" file in its working directory
+ACTIVATED_SERVER = """
+import os, socket, time
+assert os.environ["LISTEN_PID"] == str(os.getpid())
+count = int(os.environ["LISTEN_FDS"])
+while not os.path.exists("boot"):
+    time.sleep(0.05)
+servers = [socket.socket(fileno=3 + n) for n in range(count)]
+while True:
+    for server in servers:
+        server.settimeout(0.05)
+        try:
+            conn, _ = server.accept()
+        except socket.timeout:
+            continue
+        with conn:
+            conn.sendall(conn.recv(1024).upper())
+"""
+
+
+def echo(address, data=b"bacon\n"):
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(10)
+        sock.connect(address)
+        sock.sendall(data)
+        return sock.recv(1024)
+
+
+def test_sockets_are_passed_to_process(xprocess, tmp_path):
+    unix_path = str(tmp_path / "activation.sock")
+
+    class Starter(ProcessStarter):
+        listen_sockets = [0, unix_path]
+        args = [sys.executable, "-c", ACTIVATED_SERVER]
+
+    boot = xprocess.getinfo("activated").controldir.join("boot")
+    if boot.check():
+        boot.remove()
+    # ready before the server boots, connections wait in the backlog
+    result = xprocess.ensure("activated", Starter, restart=True)
+    boot.write("")
+    pid, logpath = result
+    (host, port), path = result.addresses
+    assert host == "127.0.0.1" and port > 0
+    assert path == unix_path
+    assert echo((host, port)) == b"BACON\n"
+    assert echo(path) == b"BACON\n"
+
+    # addresses are remembered when the process is reused
+    assert xprocess.ensure("activated", Starter).addresses == result.addresses
+    info = xprocess.getinfo("activated")
+    assert info.pid == pid
+    assert info.addresses == result.addresses
+    info.terminate()
+
+
+def test_ensure_result(xprocess):
+    class Starter(ProcessStarter):
+        pattern = "started"
+        args = [
+            sys.executable,
+            "-c",
+            "print('started', flush=True); import time; time.sleep(60)",
+        ]
+
+    result = xprocess.ensure("plain_result", Starter)
+    info = xprocess.getinfo("plain_result")
+    assert result == (info.pid, info.logpath)
+    assert result.pid == info.pid
+    assert result.addresses == []
+    info.terminate()
@@ -0,0 +1,60 @@
+import sys
+import time
+
+import pytest
+
+from xprocess import ProcessStarter
+from xprocess import StartupError
+
+CRASH = "print('bad config', flush=True); raise SystemExit(3)"
+ERROR = "import time; print('Address already in use', flush=True); time.sleep(60)"
+
+
+@pytest.mark.parametrize("proc_name", ["s1", "s2"])
+def test_exit_during_pattern_wait(xprocess, proc_name):
+    class Starter(ProcessStarter):
+        timeout = 60
+        pattern = "will not match"
+        args = [sys.executable, "-c", CRASH]
+
+    start = time.monotonic()
+    with pytest.raises(StartupError, match="exited with code 3") as excinfo:
+        xprocess.ensure(proc_name, Starter)
+    assert time.monotonic() - start < 10
+    assert excinfo.value.returncode == 3
+    assert excinfo.value.log_tail == ["bad config"]
+    assert not xprocess.getinfo(proc_name).isrunning()
+
+
+def test_exit_during_callback_wait(xprocess):
+    class Starter(ProcessStarter):
+        timeout = 60
+        args = [sys.executable, "-c", CRASH]
+
+        def startup_check(self):
+            return False
+
+    with pytest.raises(StartupError) as excinfo:
+        xprocess.ensure("crash_callback", Starter)
+    assert excinfo.value.returncode == 3
+
+
+@pytest.mark.parametrize(
+    "error_pattern", ["already in use", ["unrelated", "Address .* in use"]]
+)
+def test_error_pattern(xprocess, error_pattern):
+    class Starter(ProcessStarter):
+        timeout = 60
+        pattern = "will not match"
+        args = [sys.executable, "-c", ERROR]
+
+    Starter.error_pattern = error_pattern
+
+    for _ in range(2):
+        # terminated, so the next ensure does not reuse it
+        with pytest.raises(StartupError, match="Address already in use") as excinfo:
+            xprocess.ensure("error_pattern", Starter)
+        assert excinfo.value.returncode is None
+        info = xprocess.getinfo("error_pattern")
+        assert not info.isrunning()
+        assert info.read_state()["terminated"]
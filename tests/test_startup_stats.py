@@ -0,0 +1,150 @@
+import json
+import sys
+
+import pytest
+
+from xprocess import ProcessStarter
+from xprocess.stats import percentile
+from xprocess.stats import regressed
+from xprocess.stats import summarize
+from xprocess.stats import trend
+
+PRINT_STARTED = (
+    "import time; time.sleep(0.2); print('started', flush=True); time.sleep(60)"
+)
+
+
+class Starter(ProcessStarter):
+    pattern = "started"
+    args = [sys.executable, "-c", PRINT_STARTED]
+
+    def startup_check(self):
+        return True
+
+
+def test_percentile_and_trend():
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile([1, 2], 50) == 1.5
+    assert percentile([5], 99) == 5
+    with pytest.raises(ValueError):
+        percentile([], 50)
+    assert trend([1]) is None
+    assert trend([1, 1, 1, 2, 2]) == pytest.approx(1)
+    assert trend([2] * 10 + [1] * 5) == pytest.approx(-0.5)
+
+
+def test_regressed():
+    history = [{"total": 1.0}] * 3
+    assert not regressed(history + [{"total": 1.9}], 2)
+    assert regressed(history + [{"total": 2.1}], 2)
+    # too few startups to compare with
+    assert not regressed(history[:2] + [{"total": 9}], 2)
+    assert not regressed(history + [{"total": 9}], None)
+
+
+def test_summarize():
+    history = [{"total": 1.0, "pattern": 1.0}] * 4 + [{"total": 3.0, "pattern": 3.0}]
+    lines = summarize("server", history, factor=2)
+    assert lines == [
+        "server total 5 starts p50 1.000s p90 2.200s p99 2.920s last 3.000s "
+        "trend +100% REGRESSED",
+        "server pattern 5 starts p50 1.000s p90 2.200s p99 2.920s last 3.000s "
+        "trend +100%",
+    ]
+
+
+def test_startups_recorded(xprocess, monkeypatch):
+    monkeypatch.setattr("xprocess.xprocess.HISTORY_SIZE", 2)
+    name = "startup_stats"
+    info = xprocess.getinfo(name)
+    if info.statspath.check():
+        info.statspath.remove()
+    for _ in range(3):
+        xprocess.ensure(name, Starter, restart=True)
+    # reused processes are not started, nothing to record
+    xprocess.ensure(name, Starter)
+    history = info.startup_history()
+    assert len(history) == 2
+    for durations in history:
+        assert set(durations) == {"total", "pattern", "startup_check"}
+        assert durations["pattern"] >= 0.2
+        assert durations["startup_check"] >= 0.1
+        assert durations["total"] == pytest.approx(
+            durations["pattern"] + durations["startup_check"]
+        )
+    info.terminate()
+
+
+def test_regression_fails_session(testdir):
+    testdir.makeini(
+        """
+        [pytest]
+        xprocess_startup_regression_factor = 2
+    """
+    )
+    testdir.makepyfile(
+        f"""
+        import sys
+        from xprocess import ProcessStarter
+
+        def test_start(xprocess):
+            class Starter(ProcessStarter):
+                pattern = "started"
+                args = [sys.executable, "-c", {PRINT_STARTED!r}]
+
+            xprocess.ensure("slow", Starter, restart=True)
+            xprocess.getinfo("slow").terminate()
+    """
+    )
+    statspath = testdir.tmpdir.join(".pytest_cache/d/.xprocess/slow/xprocess.stats")
+    statspath.ensure().write(json.dumps([{"total": 0.01, "pattern": 0.01}] * 3))
+    result = testdir.runpytest()
+    result.assert_outcomes(passed=1)
+    assert result.ret == 1
+    result.stdout.fnmatch_lines(
+        [
+            "*xprocess startup regressions*",
+            "slow took *s to start, * times its median of 0.010s",
+        ]
+    )
+
+    result = testdir.runpytest("--xstats")
+    assert result.ret == 1
+    result.stdout.fnmatch_lines(
+        [
+            "slow total 4 starts p50 * last * trend * REGRESSED",
+            "slow pattern 4 starts p50 *",
+        ]
+    )
+
+    # the slow startup is part of the baseline now
+    testdir.makeini(
+        """
+        [pytest]
+        xprocess_startup_regression_factor = 100
+    """
+    )
+    result = testdir.runpytest()
+    result.assert_outcomes(passed=1)
+    assert result.ret == 0
+
+
+@pytest.mark.parametrize("factor", ["spam", "0", "nan"])
+def test_invalid_regression_factor(testdir, factor):
+    testdir.makeini(
+        f"""
+        [pytest]
+        xprocess_startup_regression_factor = {factor}
+    """
+    )
+    testdir.makepyfile(
+        """
+        def test_nothing():
+            pass
+    """
+    )
+    result = testdir.runpytest()
+    assert result.ret == pytest.ExitCode.USAGE_ERROR
+    result.stderr.fnmatch_lines(
+        ["*xprocess_startup_regression_factor must be a positive number, got *"]
+    )
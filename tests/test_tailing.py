@@ -0,0 +1,51 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from xprocess.tailing import LogWatcher
+
+
+def append_later(path, delay):
+    def append():
+        time.sleep(delay)
+        with open(path, "a") as f:
+            f.write("appended\n")
+
+    thread = threading.Thread(target=append)
+    thread.start()
+    return thread
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is linux only"
+)
+def test_wakes_up_on_append(tmp_path):
+    logpath = tmp_path / "xprocess.log"
+    logpath.touch()
+    with LogWatcher(logpath) as watcher:
+        assert watcher.event_driven
+        thread = append_later(logpath, 0.2)
+        start = time.monotonic()
+        watcher.wait(10)
+        assert time.monotonic() - start < 5
+        thread.join()
+
+
+def test_wait_times_out(tmp_path):
+    logpath = tmp_path / "xprocess.log"
+    logpath.touch()
+    with LogWatcher(logpath) as watcher:
+        start = time.monotonic()
+        watcher.wait(0.2)
+        assert time.monotonic() - start < 2
+
+
+def test_polling_fallback():
+    watcher = LogWatcher(None)
+    assert not watcher.event_driven
+    start = time.monotonic()
+    watcher.wait(10)
+    assert time.monotonic() - start < watcher.poll_interval + 1
+    watcher.close()
@@ -0,0 +1,67 @@
+import subprocess
+import sys
+import time
+
+import psutil
+import pytest
+
+from xprocess import ProcessStarter
+from xprocess import termination
+from xprocess.termination import terminate_all
+
+IGNORE_SIGTERM = (
+    "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); "
+    "print('started', flush=True); time.sleep(60)"
+)
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32",
+    reason="on windows SIGTERM is treated as an alias for kill()",
+)
+def test_processes_are_terminated_concurrently(xprocess):
+    class Starter(ProcessStarter):
+        pattern = "started"
+        args = [sys.executable, "-c", IGNORE_SIGTERM]
+
+    names = [f"stuck{n}" for n in range(4)]
+    xprocess.ensure_all({name: Starter for name in names})
+    infos = [xprocess.getinfo(name) for name in names]
+    infos.append(xprocess.getinfo("never_started"))
+
+    start = time.monotonic()
+    codes = terminate_all(infos, timeout=1)
+    # a single shared deadline, not one per process
+    assert time.monotonic() - start < len(names)
+    assert codes == [1, 1, 1, 1, 0]
+    assert not any(info.isrunning() for info in infos)
+
+
+@pytest.fixture(params=["pidfd", "psutil"])
+def wait_mode(request, monkeypatch):
+    if request.param == "psutil":
+        monkeypatch.setattr(termination, "_open_pidfds", lambda procs: None)
+    elif not hasattr(termination.os, "pidfd_open"):
+        pytest.skip("pidfds are not available")
+    return request.param
+
+
+def test_wait_procs(wait_mode):
+    exiting = [
+        subprocess.Popen([sys.executable, "-c", "import time; time.sleep(0.3)"])
+        for _ in range(3)
+    ]
+    with subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"]) as p:
+        stuck = psutil.Process(p.pid)
+        procs = [psutil.Process(e.pid) for e in exiting]
+
+        start = time.monotonic()
+        assert termination._wait_procs(procs, 30) == []
+        assert time.monotonic() - start < 5
+
+        start = time.monotonic()
+        assert termination._wait_procs([stuck], 0.2) == [stuck]
+        assert 0.2 <= time.monotonic() - start < 5
+        p.kill()
+    for e in exiting:
+        e.wait()
@@ -0,0 +1,123 @@
+import time
+
+import psutil
+import pytest
+
+from xprocess import XProcess
+from xprocess.watchdog import Watchdog
+
+# exits with code 3 once it has been running for a while
+CRASH = (
+    "import sys, time; print('started', flush=True); "
+    "time.sleep(float(sys.argv[1])); print('out of memory', flush=True); "
+    "sys.exit(3)"
+)
+
+
+def kill(info):
+    # the exit status is left for the watchdog to collect
+    psutil.Process(info.pid).kill()
+    deadline = time.monotonic() + 10
+    while info.isrunning() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def xproc(request, xprocess):
+    # processes left by other tests of the session are not watched
+    with XProcess(request.config, xprocess.rootdir) as own:
+        yield own
+
+
+def test_restart_on_crash(xproc, make_starter):
+    watchdog = Watchdog(lambda: xproc)
+    restarted = make_starter(60, script=CRASH, restart_on_crash=1)
+    xproc.ensure("watchdog", restarted, restart=True)
+    info = xproc.getinfo("watchdog")
+    first_pid = info.pid
+    watchdog.check()
+    assert not watchdog.crashes
+
+    kill(info)
+    watchdog.check()
+    [crash] = watchdog.crashes
+    assert crash.restarted and crash.pid == first_pid
+    assert crash.returncode == -9
+    info = xproc.getinfo("watchdog")
+    assert info.pid != first_pid and info.isrunning()
+    assert not watchdog.crashed
+
+    # the restart budget is exhausted
+    second_pid = info.pid
+    kill(info)
+    watchdog.check()
+    assert watchdog.crashed["watchdog"].pid == second_pid
+    assert not watchdog.crashed["watchdog"].restarted
+    assert watchdog.summary() == [
+        f"watchdog (pid {first_pid}) crashed with exit code -9, restarted",
+        f"watchdog (pid {second_pid}) crashed with exit code -9, left down",
+    ]
+
+    # started again by the tests
+    xproc.ensure("watchdog", make_starter(60, script=CRASH))
+    watchdog.check()
+    assert not watchdog.crashed
+    xproc.getinfo("watchdog").terminate()
+
+
+def test_terminated_is_no_crash(xproc, make_starter):
+    watchdog = Watchdog(lambda: xproc)
+    restarted = make_starter(60, script=CRASH, restart_on_crash=1)
+    xproc.ensure("watchdog_terminated", make_starter(60, script=CRASH), restart=True)
+    xproc.getinfo("watchdog_terminated").terminate()
+    # restarting terminates the previous instance too
+    xproc.ensure("watchdog_terminated", restarted)
+    xproc.ensure("watchdog_terminated", restarted, restart=True)
+    watchdog.check()
+    xproc.getinfo("watchdog_terminated").terminate()
+    watchdog.check()
+    assert not watchdog.crashes
+
+
+def test_dependent_tests_fail_fast(testdir):
+    testdir.makeconftest(
+        f"""
+        import sys
+        import pytest
+        from xprocess import ProcessStarter
+
+        class Starter(ProcessStarter):
+            pattern = "started"
+            args = [sys.executable, "-c", {CRASH!r}, "0.2"]
+
+        @pytest.fixture
+        def crashing(xprocess):
+            xprocess.ensure("crashing", Starter)
+    """
+    )
+    testdir.makepyfile(
+        """
+        import time
+        import pytest
+
+        def test_crash(crashing):
+            time.sleep(2)
+
+        @pytest.mark.xprocess("crashing")
+        def test_needs_process(crashing):
+            pass
+
+        def test_independent():
+            pass
+    """
+    )
+    result = testdir.runpytest("--xwatchdog", "0.05")
+    result.assert_outcomes(passed=2, errors=1)
+    result.stdout.fnmatch_lines(
+        [
+            "*process crashing (pid *) crashed with exit code 3",
+            "*out of memory",
+            "*xprocess crashes*",
+            "crashing (pid *) crashed with exit code 3, left down",
+        ]
+    )
@@ -1,11 +1,29 @@
+from .pool import Lease
+from .pool import XProcessPool
+from .probes import FileExistsReady
+from .probes import HTTPReady
+from .probes import Probe
+from .probes import TCPPortReady
+from .probes import UnixSocketReady
+from .xprocess import AsyncProcessStarter
 from .xprocess import ProcessStarter
+from .xprocess import StartupError
 from .xprocess import XProcess
 from .xprocess import XProcessInfo
 from .xprocess import XProcessResources
 
 __all__ = [
+    "AsyncProcessStarter",
+    "FileExistsReady",
+    "HTTPReady",
+    "Lease",
+    "Probe",
     "ProcessStarter",
+    "StartupError",
+    "TCPPortReady",
+    "UnixSocketReady",
     "XProcess",
     "XProcessResources",
     "XProcessInfo",
+    "XProcessPool",
 ]
@@ -0,0 +1,77 @@
+import os
+import socket
+import sys
+
+# command run by the child before the actual process, it moves the passed
+# sockets to the file descriptors expected by sd_listen_fds(3) (3, 4, ...)
+# and sets LISTEN_PID, which can only be known after forking
+ACTIVATE = """\
+import fcntl, os, sys
+fds = [int(fd) for fd in sys.argv[1].split(",")]
+moved = [fcntl.fcntl(fd, fcntl.F_DUPFD, 3 + len(fds)) for fd in fds]
+for fd in fds:
+    os.close(fd)
+for n, fd in enumerate(moved):
+    os.dup2(fd, 3 + n)
+    os.close(fd)
+os.environ["LISTEN_PID"] = str(os.getpid())
+os.environ["LISTEN_FDS"] = str(len(fds))
+os.execvp(sys.argv[2], sys.argv[2:])
+"""
+
+
+def bind_listen_sockets(addresses, backlog=128):
+    """Bind and listen on the given addresses.
+
+    @param addresses: iterable of TCP ports (bound on 127.0.0.1),
+                      (host, port) tuples or unix socket paths. Port 0
+                      binds to a free port chosen by the OS.
+
+    @return: list of listening sockets."""
+    if sys.platform == "win32":  # pragma: no cover
+        raise RuntimeError("socket activation is not supported on windows")
+    sockets = []
+    try:
+        for address in addresses:
+            sockets.append(_bind(address, backlog))
+    except BaseException:
+        for sock in sockets:
+            sock.close()
+        raise
+    return sockets
+
+
+def _bind(address, backlog):
+    if isinstance(address, int):
+        address = ("127.0.0.1", address)
+    if isinstance(address, tuple):
+        host, port = address
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        bind_address = (host, port)
+    else:
+        bind_address = os.fspath(address)
+        if os.path.exists(bind_address):
+            os.unlink(bind_address)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.bind(bind_address)
+        sock.listen(backlog)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+def bound_address(sock):
+    """Return the (host, port) or path a listening socket is bound to."""
+    address = sock.getsockname()
+    return address[:2] if isinstance(address, tuple) else address
+
+
+def activation_args(args, sockets):
+    """Wrap the command line ``args`` so the process receives ``sockets``
+    following the systemd socket activation protocol."""
+    fds = ",".join(str(sock.fileno()) for sock in sockets)
+    return [sys.executable, "-S", "-c", ACTIVATE, fds, *args]
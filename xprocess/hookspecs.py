@@ -0,0 +1,15 @@
+import pluggy
+
+hookspec = pluggy.HookspecMarker("pytest")
+
+
+@hookspec
+def pytest_xprocess_declare(config):
+    """Return a dict mapping the names of processes to start in the
+    background, as soon as the test session is configured, to their
+    ProcessStarter subclass. See ``XProcess.prestart``.
+
+    Declared processes are kept running only if a selected test requests
+    them with the ``xprocess`` marker, directly or through ``depends_on``.
+
+    :param pytest.Config config: The pytest config object."""
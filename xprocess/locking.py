@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+
+if sys.platform == "win32":  # pragma: no cover
+    import msvcrt
+
+    def _lock(fd, blocking):
+        # LK_LOCK gives up after 10 seconds, poll instead
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+    def _unlock(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    _CAN_BLOCK = False
+
+else:
+    import fcntl
+
+    def _lock(fd, blocking):
+        fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _unlock(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+    _CAN_BLOCK = True
+
+
+class FileLock:
+    """Exclusive lock on a file, shared by every process using the same
+    path, such as pytest-xdist workers or test runs happening concurrently
+    on the same host. The lock is released by the OS if its holder dies.
+
+    Locks are not reentrant, acquiring the same path twice from a single
+    process blocks just like it would from two different processes."""
+
+    poll_interval = 0.05
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._fd = None
+
+    def __repr__(self):
+        return f"<FileLock {self.path} locked={self.locked}>"
+
+    @property
+    def locked(self):
+        return self._fd is not None
+
+    def acquire(self, timeout=None):
+        """Block until the lock is acquired. Will raise TimeoutError if it
+        can not be acquired within ``timeout`` seconds."""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if timeout is None and _CAN_BLOCK:
+                _lock(fd, blocking=True)
+            else:
+                self._poll(fd, timeout)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return self
+
+    def _poll(self, fd, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                _lock(fd, blocking=False)
+                return
+            except OSError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(
+                        f"could not acquire {self.path} within {timeout} seconds"
+                    ) from None
+            time.sleep(self.poll_interval)
+
+    def release(self):
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        try:
+            _unlock(fd)
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
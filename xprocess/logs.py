@@ -0,0 +1,249 @@
+import importlib
+import json
+import os
+import re
+import shutil
+import threading
+
+XPROCESS_BLOCK_DELIMITER = "@@__xproc_block_delimiter__@@"
+BLOCK_DELIMITER_LINE = f"{XPROCESS_BLOCK_DELIMITER}\n".encode()
+
+# compression of rotated logs: (file suffix, module providing open())
+COMPRESSIONS = {
+    None: ("", None),
+    "gzip": (".gz", "gzip"),
+    "bz2": (".bz2", "bz2"),
+    "xz": (".xz", "lzma"),
+    # only part of the standard library since python 3.14
+    "zstd": (".zst", "compression.zstd"),
+}
+
+
+class LogBlockIndex:
+    """Sidecar index of a persisted process log file.
+
+    Each time a process is started, xprocess appends a block delimiter
+    line to its log file. The index records the byte offset of every
+    delimiter along with how many bytes of the log have been accounted for,
+    so the newest block can be found without reading the whole log. When
+    the index is missing or no longer matches the log (e.g. the log has been
+    truncated) it is rebuilt, otherwise only data appended since it was last
+    updated is scanned."""
+
+    chunk_size = 1024 * 1024
+
+    def __init__(self, logpath):
+        self.logpath = str(logpath)
+        self.path = f"{self.logpath}.idx"
+        self.offsets = []
+        self.size = 0
+
+    def __repr__(self):
+        return f"<LogBlockIndex {self.path} blocks={len(self.offsets)}>"
+
+    @property
+    def last_block_start(self):
+        """Offset of the first byte of the newest block, None if the log
+        has no blocks."""
+        if not self.offsets:
+            return None
+        return self.offsets[-1] + len(BLOCK_DELIMITER_LINE)
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self.offsets, self.size = list(data["offsets"]), int(data["size"])
+        except (OSError, ValueError, KeyError, TypeError):
+            self.offsets, self.size = [], 0
+
+    def save(self):
+        tmppath = f"{self.path}.{os.getpid()}.{threading.get_ident()}"
+        with open(tmppath, "w") as f:
+            json.dump({"offsets": self.offsets, "size": self.size}, f)
+        os.replace(tmppath, self.path)
+
+    def remove(self):
+        self.offsets, self.size = [], 0
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def refresh(self):
+        """Load the index, bringing it up to date with the log file."""
+        self.load()
+        try:
+            log = open(self.logpath, "rb")
+        except FileNotFoundError:
+            self.offsets, self.size = [], 0
+            return self
+        with log:
+            size = os.fstat(log.fileno()).st_size
+            if not self._matches(log, size):
+                self.offsets, self.size = [], 0
+            if self.size < size:
+                self._scan(log, size)
+                self.save()
+        return self
+
+    def _matches(self, log, size):
+        if self.size > size:
+            return False
+        if not self.offsets:
+            return True
+        # the newest recorded delimiter must still be where it was
+        log.seek(self.offsets[-1])
+        return log.read(len(BLOCK_DELIMITER_LINE)) == BLOCK_DELIMITER_LINE
+
+    def _scan(self, log, size):
+        # keep enough bytes between chunks to find
+        # delimiters spanning chunk boundaries
+        overlap = len(BLOCK_DELIMITER_LINE) - 1
+        start = max(self.size - overlap, 0)
+        log.seek(start)
+        buf = b""
+        while start + len(buf) < size:
+            chunk = log.read(min(self.chunk_size, size - start - len(buf)))
+            if not chunk:
+                break
+            buf += chunk
+            pos = buf.find(BLOCK_DELIMITER_LINE)
+            while pos != -1:
+                self.offsets.append(start + pos)
+                pos = buf.find(BLOCK_DELIMITER_LINE, pos + 1)
+            # the kept bytes are too short to hold a whole delimiter,
+            # so nothing is found twice
+            keep = min(len(buf), overlap)
+            start += len(buf) - keep
+            buf = buf[len(buf) - keep :]
+        self.size = size
+
+    def append(self, offset):
+        """Record a block delimiter written by xprocess at ``offset``."""
+        self.offsets.append(offset)
+        self.size = offset + len(BLOCK_DELIMITER_LINE)
+        self.save()
+
+
+def needs_rotation(logpath, max_bytes=None, max_blocks=None):
+    """Return whether a new block can not be appended to the log file at
+    ``logpath`` without it exceeding ``max_bytes`` or ``max_blocks``."""
+    try:
+        size = os.path.getsize(str(logpath))
+    except OSError:
+        return False
+    if max_bytes is not None and size >= max_bytes:
+        return True
+    if max_blocks is not None:
+        return len(LogBlockIndex(logpath).refresh().offsets) >= max_blocks
+    return False
+
+
+def archived_logs(logpath):
+    """Return the paths of the rotated archives of the log file at
+    ``logpath``, newest first."""
+    logpath = str(logpath)
+    directory, basename = os.path.split(logpath)
+    suffixes = "|".join(re.escape(suffix) for suffix, _ in COMPRESSIONS.values())
+    archive = re.compile(rf"{re.escape(basename)}\.(\d+)({suffixes})$")
+    found = []
+    for name in os.listdir(directory or "."):
+        match = archive.match(name)
+        if match:
+            found.append((int(match.group(1)), os.path.join(directory, name)))
+    return [path for _, path in sorted(found)]
+
+
+def log_opener(compression):
+    """Return the function opening rotated logs compressed with
+    ``compression`` (one of COMPRESSIONS) for writing, None if they are not
+    compressed. Will raise ValueError if the compression is not supported."""
+    if compression not in COMPRESSIONS:
+        raise ValueError(
+            f"unsupported log compression {compression!r}, expected one of "
+            + ", ".join(repr(name) for name in COMPRESSIONS)
+        )
+    module = COMPRESSIONS[compression][1]
+    if module is None:
+        return None
+    try:
+        return importlib.import_module(module).open
+    except ImportError:
+        raise ValueError(
+            f"{compression} log compression is not available "
+            "with this version of python"
+        ) from None
+
+
+def rotate_log(logpath, backup_count, compression=None):
+    """Move the log file at ``logpath`` to ``<logpath>.1``, compressed with
+    ``compression`` (one of COMPRESSIONS), shifting previous archives to
+    ``<logpath>.2`` and so on. Only the newest ``backup_count`` archives are
+    kept. The log file is rotated as a whole, so archives hold whole blocks.
+
+    @return: path of the new archive, None if the log was discarded."""
+    opener = log_opener(compression)
+    suffix = COMPRESSIONS[compression][0]
+    logpath = str(logpath)
+    for path in reversed(archived_logs(logpath)):
+        number, old_suffix = _archive_number(logpath, path)
+        if number >= backup_count:
+            os.unlink(path)
+        else:
+            os.replace(path, f"{logpath}.{number + 1}{old_suffix}")
+
+    LogBlockIndex(logpath).remove()
+    if backup_count < 1:
+        os.unlink(logpath)
+        return None
+    archive = f"{logpath}.1{suffix}"
+    if opener is None:
+        os.replace(logpath, archive)
+        return archive
+    tmppath = f"{archive}.{os.getpid()}.{threading.get_ident()}"
+    with open(logpath, "rb") as src, opener(tmppath, "wb") as dst:
+        shutil.copyfileobj(src, dst, LogBlockIndex.chunk_size)
+    os.replace(tmppath, archive)
+    os.unlink(logpath)
+    return archive
+
+
+def _archive_number(logpath, path):
+    number, _, suffix = path[len(logpath) + 1 :].partition(".")
+    return int(number), f".{suffix}" if suffix else ""
+
+
+def read_log_section(path, start, max_bytes=None):
+    """Read what has been written to the log file at ``path`` from byte
+    offset ``start`` on. At most the last ``max_bytes`` bytes are read, in
+    which case the section starts with a pointer to the full log file.
+
+    @return: (section, end offset)"""
+    with open(str(path), "rb") as f:
+        end = os.fstat(f.fileno()).st_size
+        if start > end:
+            # the log has been truncated or rotated in the meantime
+            start = 0
+        skipped = 0
+        if max_bytes and end - start > max_bytes:
+            skipped = end - start - max_bytes
+        f.seek(start + skipped)
+        data = f.read(end - start - skipped)
+    if skipped:
+        # do not start in the middle of a line
+        newline = data.find(b"\n")
+        if newline != -1:
+            skipped += newline + 1
+            data = data[newline + 1 :]
+    section = data.decode("utf-8", errors="surrogateescape")
+    if skipped:
+        section = f"[{format_size(skipped)} skipped, full log at {path}]\n{section}"
+    return section, end
+
+
+def format_size(size):
+    """Format a size in bytes for humans, e.g. 1.5 MiB."""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            break
+        size /= 1024
+    return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
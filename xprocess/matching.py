@@ -0,0 +1,131 @@
+import collections
+import json
+import re
+import time
+
+MatchEvent = collections.namedtuple("MatchEvent", "pattern line time fields")
+MatchEvent.__doc__ = """A readiness pattern matched by a line of a process log.
+
+@ivar pattern: the pattern, as given in ProcessStarter.pattern or patterns.
+@ivar line: the matching line, without its line ending.
+@ivar time: when the line has been matched, as returned by time.time().
+@ivar fields: the parsed JSON object for dict patterns, None otherwise."""
+
+_MISSING = object()
+
+_INLINE_FLAGS = {re.IGNORECASE: "i", re.MULTILINE: "m", re.DOTALL: "s", re.VERBOSE: "x"}
+
+
+def _regex_source(pattern):
+    """Return the source of a regex, scoping the flags of compiled
+    patterns to it so it can be combined with others."""
+    if not isinstance(pattern, re.Pattern):
+        return pattern
+    flags = "".join(f for flag, f in _INLINE_FLAGS.items() if pattern.flags & flag)
+    return f"(?{flags}:{pattern.pattern})" if flags else pattern.pattern
+
+
+# keys written the same way by every JSON encoder, others may be escaped,
+# e.g. "caf\u00e9" by python's json or "\u0026" for "&" by go's
+_PLAIN_KEY = re.compile(r"[\w .:-]+", re.ASCII)
+
+
+def _fields_source(fields):
+    """Return a regex finding the lines which may hold ``fields``, so that
+    only those are parsed as JSON. Values are left to the comparison of the
+    parsed fields, as well as keys which may be escaped."""
+    for key in fields:
+        if isinstance(key, str) and _PLAIN_KEY.fullmatch(key):
+            return re.escape(json.dumps(key))
+    return r"\{"
+
+
+def _parse_fields(line):
+    line = line.strip()
+    if not line.startswith("{"):
+        return None
+    try:
+        fields = json.loads(line)
+    except ValueError:
+        return None
+    return fields if isinstance(fields, dict) else None
+
+
+class PatternSet:
+    """Readiness patterns, all or any of which must be matched by the lines
+    of a process log.
+
+    Patterns are regexes, or dicts matching JSON lines whose fields have the
+    given values. Every line is first searched with a single regex combining
+    all patterns, so that lines matching none of them cost one search only,
+    and JSON lines are only parsed when they may hold the expected values.
+
+    @param patterns: iterable of regexes (str or compiled) and dicts.
+    @param mode: "all" if every pattern must be matched, "any" if one is
+                 enough.
+
+    @ivar events: MatchEvent for each pattern matched so far, in order."""
+
+    def __init__(self, patterns, mode="all"):
+        if mode not in ("all", "any"):
+            raise ValueError(f"mode must be 'all' or 'any', got {mode!r}")
+        self.patterns = list(patterns)
+        if not self.patterns:
+            raise ValueError("at least one pattern is needed")
+        self.mode = mode
+        self.events = []
+        self._pending = list(range(len(self.patterns)))
+        self._regexes = {
+            n: re.compile(pattern)
+            for n, pattern in enumerate(self.patterns)
+            if not isinstance(pattern, dict)
+        }
+        self.source = "|".join(
+            "(?:{})".format(
+                _fields_source(pattern)
+                if isinstance(pattern, dict)
+                else _regex_source(pattern)
+            )
+            for pattern in self.patterns
+        )
+        try:
+            self._prefilter = re.compile(self.source)
+        except re.error:
+            # e.g. global inline flags in the middle of the combined regex
+            self.source = None
+            self._prefilter = None
+
+    def __repr__(self):
+        return f"<PatternSet {self.mode} of {self.patterns!r}>"
+
+    @property
+    def satisfied(self):
+        return not self._pending if self.mode == "all" else bool(self.events)
+
+    def match(self, line):
+        """Match ``line`` against the patterns not matched yet, recording
+        a MatchEvent for each of them it matches.
+
+        @return: whether the patterns are satisfied."""
+        if self._prefilter is not None and not self._prefilter.search(line):
+            return self.satisfied
+        fields = None
+        for n in list(self._pending):
+            pattern = self.patterns[n]
+            if isinstance(pattern, dict):
+                if fields is None:
+                    fields = _parse_fields(line) or {}
+                if not fields or any(
+                    fields.get(key, _MISSING) != value for key, value in pattern.items()
+                ):
+                    continue
+                event_fields = fields
+            elif self._regexes[n].search(line):
+                event_fields = None
+            else:
+                continue
+            self._pending.remove(n)
+            self.events.append(
+                MatchEvent(pattern, line.rstrip("\r\n"), time.time(), event_fields)
+            )
+        return self.satisfied
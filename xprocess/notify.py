@@ -0,0 +1,148 @@
+import asyncio
+import os
+import socket
+import struct
+import sys
+import tempfile
+import time
+import uuid
+
+# maximum length of a unix socket path, sizeof(sockaddr_un.sun_path) is 108
+# on Linux and 104 on macOS and BSDs, leave room for the trailing NUL byte
+MAX_SOCKET_PATH = 100
+
+# SO_TIMESTAMP is not exposed by the socket module, with it the kernel
+# attaches the time each datagram was received to the datagram itself
+SO_TIMESTAMP = 29 if sys.platform.startswith("linux") else None
+TIMEVAL = struct.Struct("@ll")
+
+
+class NotifySocket:
+    """Unix datagram socket receiving sd_notify(3) messages from a process.
+
+    The address to be exported to the process as ``NOTIFY_SOCKET`` is
+    available as ``address``. Received ``STATUS=`` messages are appended to
+    the process log file, ``READY=1`` sets ``ready`` and ``WATCHDOG=1``
+    heartbeats update ``last_watchdog``, see ``watchdog_alive``."""
+
+    def __init__(self, path, logpath=None):
+        if sys.platform == "win32":  # pragma: no cover
+            raise RuntimeError("sd_notify is not supported on windows")
+        self.logpath = logpath
+        self.ready = False
+        self.status = None
+        self.last_watchdog = None
+        self.messages = []
+        self.path = None
+        self._inode = None
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        if SO_TIMESTAMP is not None:
+            self.sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMP, 1)
+        path = os.fspath(path)
+        if len(os.fsencode(path)) > MAX_SOCKET_PATH:
+            if sys.platform.startswith("linux"):
+                # abstract namespace, no file system path involved
+                name = f"xprocess-{uuid.uuid4().hex}"
+                self.sock.bind(f"\0{name}")
+                self.address = f"@{name}"
+                return
+            path = os.path.join(tempfile.gettempdir(), f"xp-{uuid.uuid4().hex}.sock")
+        if os.path.exists(path):
+            os.unlink(path)
+        self.sock.bind(path)
+        self.path = self.address = path
+        self._inode = self._stat_inode(path)
+
+    @staticmethod
+    def _stat_inode(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_dev, st.st_ino
+
+    def __repr__(self):
+        return f"<NotifySocket {self.address} ready={self.ready}>"
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def receive(self, timeout):
+        """Wait up to ``timeout`` seconds for a message and handle it.
+
+        @return: dict of the received fields, or None on timeout."""
+        self.sock.settimeout(max(timeout, 0))
+        try:
+            return self._receive()
+        finally:
+            self.sock.setblocking(False)
+
+    async def receive_async(self, timeout):
+        """Asyncio counterpart of ``NotifySocket.receive``."""
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        loop.add_reader(
+            self.fileno(), lambda: readable.done() or readable.set_result(None)
+        )
+        try:
+            await asyncio.wait_for(readable, max(timeout, 0))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            loop.remove_reader(self.fileno())
+        return self._receive()
+
+    def poll(self):
+        """Handle all messages received so far without blocking."""
+        while self._receive() is not None:
+            pass
+
+    def _receive(self):
+        try:
+            data, ancdata, _, _ = self.sock.recvmsg(
+                4096, socket.CMSG_SPACE(TIMEVAL.size)
+            )
+        except (socket.timeout, BlockingIOError):
+            return None
+        received = time.time()
+        for level, kind, value in ancdata:
+            if level == socket.SOL_SOCKET and kind == SO_TIMESTAMP:
+                seconds, microseconds = TIMEVAL.unpack(value[: TIMEVAL.size])
+                received = seconds + microseconds / 1e6
+        return self._handle(data, received)
+
+    def _handle(self, data, received):
+        fields = dict(
+            line.partition("=")[::2]
+            for line in data.decode("utf-8", errors="replace").splitlines()
+            if "=" in line
+        )
+        self.messages.append(fields)
+        if fields.get("READY") == "1":
+            self.ready = True
+        if fields.get("WATCHDOG") == "1":
+            self.last_watchdog = received
+        if "STATUS" in fields:
+            self.status = fields["STATUS"]
+            if self.logpath is not None:
+                with open(str(self.logpath), "ab") as log:
+                    log.write(f"sd_notify STATUS={self.status}\n".encode())
+        return fields
+
+    def watchdog_alive(self, max_age):
+        """Return whether the process has sent a ``WATCHDOG=1`` heartbeat
+        within the last ``max_age`` seconds."""
+        self.poll()
+        return (
+            self.last_watchdog is not None
+            and time.time() - self.last_watchdog <= max_age
+        )
+
+    def close(self):
+        if self.sock.fileno() == -1:
+            return
+        self.sock.close()
+        # the path may have been bound again by another socket since
+        if self.path is not None and self._stat_inode(self.path) == self._inode:
+            os.unlink(self.path)
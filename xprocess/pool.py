@@ -0,0 +1,169 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .termination import terminate_all
+
+
+class Lease:
+    """A pool instance leased to a test, see ``XProcessPool.lease``.
+
+    @ivar name: name of the leased process instance, to be used with
+                ``XProcess.getinfo``.
+    @ivar result: (PID, logfile) pair returned by ``XProcess.ensure`` when
+                  the instance was started."""
+
+    def __init__(self, pool, name, result):
+        self.pool = pool
+        self.name = name
+        self.result = result
+        self.released = False
+
+    def __repr__(self):
+        return f"<Lease {self.name} pid={self.pid}>"
+
+    @property
+    def pid(self):
+        return self.result.pid
+
+    @property
+    def logpath(self):
+        return self.result.logpath
+
+    @property
+    def info(self):
+        return self.pool.xprocess.getinfo(self.name)
+
+    def release(self, recycle=False):
+        """Hand the instance back to its pool, see ``XProcessPool.release``."""
+        self.pool.release(self, recycle)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self.released:
+            self.release()
+
+
+class XProcessPool:
+    """Keeps ``size`` identical process instances started and ready to be
+    leased, each one with its own control directory. Leased instances are
+    restarted in the background once they are handed back, so tests
+    needing a pristine process only wait for a lease instead of a full
+    startup. There are never more than ``size`` instances: with all of
+    them leased, the next lease waits for one to be handed back and
+    restarted. Pools are created with ``XProcess.pool``."""
+
+    def __init__(self, xprocess, name, preparefunc, size, persist_logs=True):
+        if size < 1:
+            raise ValueError(f"pool size must be at least 1, got {size}")
+        self.xprocess = xprocess
+        self.name = name
+        self.preparefunc = preparefunc
+        self.size = size
+        self.persist_logs = persist_logs
+        # instances of different pytest-xdist workers must not be shared
+        worker = os.environ.get("PYTEST_XDIST_WORKER")
+        prefix = f"{name}-{worker}" if worker else name
+        self.names = [f"{prefix}-pool-{n}" for n in range(size)]
+        # started instances as Lease objects, or (name, exception)
+        # pairs for instances which failed to start
+        self._ready = queue.Queue()
+        self._leased = {}
+        self._futures = []
+        self._closed = False
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=size, thread_name_prefix=f"xprocess-pool-{name}"
+        )
+        for instance in self.names:
+            self._refill(instance)
+
+    def __repr__(self):
+        return "<XProcessPool {} size={} ready={} leased={}>".format(
+            self.name, self.size, self.ready, len(self._leased)
+        )
+
+    @property
+    def ready(self):
+        """Number of instances ready to be leased."""
+        return self._ready.qsize()
+
+    def _refill(self, instance):
+        with self._lock:
+            if self._closed:
+                return
+            self._futures = [f for f in self._futures if not f.done()]
+            self._futures.append(self._executor.submit(self._start, instance))
+
+    def _start(self, instance):
+        try:
+            result = self.xprocess.ensure(
+                instance, self.preparefunc, restart=True, persist_logs=self.persist_logs
+            )
+        except Exception as err:
+            lease = (instance, err)
+        else:
+            lease = Lease(self, instance, result)
+        self.xprocess._release_replaced(instance)
+        self._ready.put(lease)
+
+    def lease(self, timeout=None):
+        """Return a Lease on a started instance, waiting for one to be
+        ready if all of them are leased or still starting. Will raise
+        TimeoutError if none is ready within ``timeout`` seconds, or the
+        error raised by ``XProcess.ensure`` if the instance failed to
+        start."""
+        if self._closed:
+            raise RuntimeError(f"{self!r} has been closed")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            try:
+                lease = self._ready.get(timeout=remaining)
+            except queue.Empty:
+                raise TimeoutError(
+                    f"no instance of {self.name} ready within {timeout} seconds"
+                ) from None
+            if isinstance(lease, tuple):
+                instance, err = lease
+                self._refill(instance)
+                raise err
+            if lease.info.isrunning():
+                break
+            # died while waiting in the pool
+            self._refill(lease.name)
+        self._leased[lease.name] = lease
+        return lease
+
+    def release(self, lease, recycle=False):
+        """Hand a leased instance back to the pool.
+
+        @param recycle: make the instance available to the next lease as it
+                        is, for tests which did not alter its state. By
+                        default it is restarted in the background instead."""
+        if lease.released:
+            return
+        lease.released = True
+        del self._leased[lease.name]
+        if self._closed:
+            lease.info.terminate()
+        elif recycle and lease.info.isrunning():
+            self._ready.put(Lease(self, lease.name, lease.result))
+        else:
+            self._refill(lease.name)
+
+    def close(self):
+        """Stop refilling the pool and terminate all of its instances,
+        including leased ones."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for future in self._futures:
+                future.cancel()
+        self._executor.shutdown(wait=True)
+        terminate_all(self.xprocess.getinfo(instance) for instance in self.names)
@@ -0,0 +1,176 @@
+import http.client
+import os
+import socket
+import threading
+import time
+from collections import namedtuple
+
+ProbeAttempt = namedtuple("ProbeAttempt", "ok duration error")
+ProbeAttempt.__doc__ = """Outcome of a single readiness check: whether it
+succeeded, how long it took in seconds and the error that made it fail,
+if any."""
+
+
+class Probe:
+    """Base class for readiness probes.
+
+    A probe repeatedly calls ``check`` until it returns True, sleeping
+    between attempts with an exponential backoff: the first retries happen
+    quickly so fast processes are detected right away, while slow processes
+    are not hammered with checks. Subclasses only need to implement
+    ``check``; ``OSError`` and ``http.client.HTTPException`` raised by it are
+    treated as "not ready yet".
+
+    Every attempt is recorded in ``attempts`` as a ``ProbeAttempt``.
+
+    @cvar initial_delay: delay in seconds before the first retry.
+    @cvar max_delay: upper bound in seconds for the delay between retries.
+    @cvar backoff_factor: factor the delay is multiplied by after each retry."""
+
+    initial_delay = 0.01
+    max_delay = 0.5
+    backoff_factor = 2
+
+    def __init__(self):
+        self.attempts = []
+
+    def check(self):
+        """Return True if the process is ready."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release resources kept between attempts."""
+
+    def attempt(self):
+        """Run ``check`` once, recording how it went."""
+        start = time.monotonic()
+        try:
+            ok, error = bool(self.check()), None
+        except (OSError, http.client.HTTPException) as err:
+            ok, error = False, err
+        self.attempts.append(ProbeAttempt(ok, time.monotonic() - start, error))
+        return ok
+
+    def wait(self, timeout, cancelled=None, abort_check=None):
+        """Attempt ``check`` until it succeeds.
+
+        @param timeout: maximum time in seconds to keep trying.
+        @param cancelled: optional ``threading.Event``, setting it makes
+                          waiting give up early.
+        @param abort_check: optional callable run between attempts, it may
+                            raise to abort waiting.
+
+        @return: True if the check succeeded, False on timeout or cancel."""
+        cancelled = cancelled or threading.Event()
+        deadline = time.monotonic() + timeout
+        delay = self.initial_delay
+        self.attempts = []
+        try:
+            while not cancelled.is_set():
+                if self.attempt():
+                    return True
+                if abort_check is not None:
+                    abort_check()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                cancelled.wait(min(delay, remaining))
+                delay = min(delay * self.backoff_factor, self.max_delay)
+            return False
+        finally:
+            self.close()
+
+
+class TCPPortReady(Probe):
+    """Ready once a TCP connection to ``host``:``port`` can be established."""
+
+    def __init__(self, port, host="localhost", connect_timeout=1.0):
+        super().__init__()
+        self.port = port
+        self.host = host
+        self.connect_timeout = connect_timeout
+
+    def __repr__(self):
+        return f"<TCPPortReady {self.host}:{self.port}>"
+
+    def check(self):
+        with socket.create_connection((self.host, self.port), self.connect_timeout):
+            return True
+
+
+class UnixSocketReady(Probe):
+    """Ready once a connection to the unix socket at ``path`` can be
+    established."""
+
+    def __init__(self, path, connect_timeout=1.0):
+        super().__init__()
+        self.path = os.fspath(path)
+        self.connect_timeout = connect_timeout
+
+    def __repr__(self):
+        return f"<UnixSocketReady {self.path}>"
+
+    def check(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.connect_timeout)
+            sock.connect(self.path)
+            return True
+
+
+class FileExistsReady(Probe):
+    """Ready once ``path`` exists, e.g. a pid or lock file written by the
+    process after initialization."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = os.fspath(path)
+
+    def __repr__(self):
+        return f"<FileExistsReady {self.path}>"
+
+    def check(self):
+        return os.path.exists(self.path)
+
+
+class HTTPReady(Probe):
+    """Ready once a ``GET`` request for ``path`` answers with ``status``.
+
+    The HTTP connection is kept alive between attempts and only
+    re-established after a failure.
+
+    @param status: expected status code, or a collection of them."""
+
+    def __init__(
+        self, port, path="/", status=200, host="localhost", connect_timeout=1.0
+    ):
+        super().__init__()
+        self.port = port
+        self.path = path
+        self.status = {status} if isinstance(status, int) else set(status)
+        self.host = host
+        self.connect_timeout = connect_timeout
+        self._conn = None
+
+    def __repr__(self):
+        return f"<HTTPReady http://{self.host}:{self.port}{self.path}>"
+
+    def check(self):
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(
+                self.host, self.port, timeout=self.connect_timeout
+            )
+        try:
+            self._conn.request("GET", self.path)
+            response = self._conn.getresponse()
+            response.read()
+        except BaseException:
+            self.close()
+            raise
+        if response.will_close:
+            self.close()
+        return response.status in self.status
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -1,9 +1,14 @@
+import importlib
 import os
 
 import pytest
 from _pytest._io import TerminalWriter
 
 from xprocess import XProcess
+from xprocess.logs import read_log_section
+from xprocess.sampling import ResourceSampler
+from xprocess.termination import terminate_all
+from xprocess.watchdog import Watchdog
 
 
 def get_log_files(root_dir):
@@ -20,6 +25,12 @@ def getrootdir(config):
     return config.cache.makedir(".xprocess")
 
 
+def pytest_addhooks(pluginmanager):
+    from xprocess import hookspecs
+
+    pluginmanager.add_hookspecs(hookspecs)
+
+
 def pytest_addoption(parser):
     group = parser.getgroup(
         "xprocess", "managing external processes across test-runs [xprocess]"
@@ -28,12 +39,63 @@ def pytest_addoption(parser):
     group.addoption(
         "--xshow", action="store_true", help="show status of external process"
     )
+    group.addoption(
+        "--xstats",
+        action="store_true",
+        help="show startup duration statistics of external processes",
+    )
+    group.addoption(
+        "--xsample",
+        type=float,
+        metavar="SECONDS",
+        help="sample CPU, memory, open files and threads of started processes "
+        "every SECONDS and report the tests during which they grew the most",
+    )
+    group.addoption(
+        "--xsample-json",
+        metavar="PATH",
+        help="write the samples taken with --xsample to PATH as JSON",
+    )
+    group.addoption(
+        "--xwatchdog",
+        type=float,
+        metavar="SECONDS",
+        help="check every SECONDS that started processes are still running, "
+        "restarting crashed ones as allowed by ProcessStarter.restart_on_crash "
+        "and failing the setup of tests marked as needing them otherwise",
+    )
+    parser.addini(
+        "xprocess_sample_max",
+        help="maximum number of samples kept by --xsample, older samples are "
+        "dropped from the JSON dump (default: 10000)",
+        default="10000",
+    )
+    parser.addini(
+        "xprocess_startup_regression_factor",
+        help="fail the test session when a process takes more than this many "
+        "times its median startup duration to start (default: disabled)",
+        default="",
+    )
+    parser.addini(
+        "xprocess_prestart",
+        type="linelist",
+        help="processes started in the background as soon as the test session "
+        "is configured, one 'name = module:ProcessStarterSubclass' per line",
+        default=[],
+    )
+    parser.addini(
+        "xprocess_log_tail_bytes",
+        help="maximum number of bytes of each process log attached to failed "
+        "test reports, 0 to attach everything (default: 65536)",
+        default="65536",
+    )
 
 
 def pytest_cmdline_main(config):
     xkill = config.option.xkill
     xshow = config.option.xshow
-    if xkill or xshow:
+    xstats = config.option.xstats
+    if xkill or xshow or xstats:
         config._do_configure()
         tw = TerminalWriter()
         rootdir = getrootdir(config)
@@ -42,6 +104,38 @@ def pytest_cmdline_main(config):
         return xprocess._xkill(tw)
     if xshow:
         return xprocess._xshow(tw)
+    if xstats:
+        return xprocess._xstats(tw, _regression_factor(config))
+
+
+def _regression_factor(config):
+    factor = config.getini("xprocess_startup_regression_factor")
+    if not factor:
+        return None
+    try:
+        value = float(factor)
+    except ValueError:
+        value = None
+    if value is None or not value > 0:
+        raise pytest.UsageError(
+            "xprocess_startup_regression_factor must be a positive number, "
+            f"got {factor!r}"
+        )
+    return value
+
+
+def _startup_regressions(config):
+    """Return (name, duration, baseline) of the processes which took more
+    than the regression factor times their baseline to start."""
+    factor = _regression_factor(config)
+    xprocess = getattr(config, "_xprocess", None)
+    if not factor or xprocess is None:
+        return []
+    return [
+        (name, durations["total"], baseline)
+        for name, durations, baseline in xprocess._startups
+        if baseline is not None and durations["total"] > factor * baseline
+    ]
 
 
 @pytest.fixture(scope="session")
@@ -49,6 +143,12 @@ def xprocess(request):
     """yield session-scoped XProcess helper to manage long-running
     processes required for testing."""
 
+    prestarting = getattr(request.config, "_xprocess", None)
+    if prestarting is not None:
+        # created when the session was configured to start declared
+        # processes, pytest_unconfigure takes care of it
+        yield prestarting
+        return
     rootdir = getrootdir(request.config)
     with XProcess(request.config, rootdir) as xproc:
         # pass in xprocess object into pytest_unconfigure
@@ -60,21 +160,210 @@ def xprocess(request):
         yield xproc
 
 
+def _log_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _check_crashed(item):
+    watchdog = getattr(item.config, "_xprocess_watchdog", None)
+    if watchdog is None:
+        return
+    for marker in item.iter_markers("xprocess"):
+        for name in marker.args:
+            crash = watchdog.crashed.get(name)
+            if crash is not None:
+                # fail right away instead of waiting on client timeouts
+                pytest.fail(str(crash), pytrace=False)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_setup(item):
+    _check_crashed(item)
+    # remember where each process log ends, so failed reports only show
+    # what has been logged during the test. Nothing is read at this point
+    logfiles = getattr(item.config, "_extlogfiles", {})
+    item._xprocess_log_offsets = {
+        name: (handle, _log_size(handle.name)) for name, handle in logfiles.items()
+    }
+    yield
+
+
+def _log_offset(item, name, handle):
+    known_handle, offset = item._xprocess_log_offsets.get(name, (None, 0))
+    if known_handle is handle:
+        return offset
+    # the process has been (re)started during the test, the
+    # handle has been left where its current log block starts
+    try:
+        return handle.tell()
+    except (OSError, ValueError):
+        return 0
+
+
 @pytest.hookimpl(hookwrapper=True)
 def pytest_runtest_makereport(item, call):
+    outcome = yield
     logfiles = getattr(item.config, "_extlogfiles", None)
-    report = yield
-    if logfiles is None:
+    if not logfiles or not hasattr(item, "_xprocess_log_offsets"):
+        return
+    report = outcome.get_result()
+    # logs are only read for failed reports
+    if not report.failed:
+        return
+    longrepr = getattr(report, "longrepr", None)
+    if not hasattr(longrepr, "addsection"):
         return
+    max_bytes = int(item.config.getini("xprocess_log_tail_bytes"))
     for name in sorted(logfiles):
-        content = logfiles[name].read()
+        handle = logfiles[name]
+        try:
+            content, end = read_log_section(
+                handle.name, _log_offset(item, name, handle), max_bytes
+            )
+        except OSError:
+            continue
+        # a later failing phase of the same test only gets what follows
+        item._xprocess_log_offsets[name] = (handle, end)
         if content:
-            longrepr = getattr(report, "longrepr", None)
-            if hasattr(longrepr, "addsection"):  # pragma: no cover
-                longrepr.addsection("%s log" % name, content)
+            longrepr.addsection("%s log" % name, content)
+
+
+def _sampled_processes(config):
+    xprocess = getattr(config, "_xprocess", None)
+    if xprocess is None:
+        return {}
+    pids = {}
+    # reused processes have no resource info, their PID file tells
+    # which instance is running, restarted or not
+    for name in sorted(xprocess._held):
+        pid = xprocess.getinfo(name).pid
+        if pid:
+            pids[name] = pid
+    return pids
+
+
+def pytest_sessionstart(session):
+    config = session.config
+    # reported before running the tests rather than once they are done
+    _regression_factor(config)
+    interval = config.getoption("xwatchdog", None)
+    if interval is not None:
+        if interval <= 0:
+            raise pytest.UsageError(f"--xwatchdog must be positive, got {interval}")
+        config._xprocess_watchdog = Watchdog(
+            lambda: getattr(config, "_xprocess", None), interval
+        ).start()
+    interval = config.getoption("xsample", None)
+    if interval is None:
+        return
+    if interval <= 0:
+        raise pytest.UsageError(f"--xsample must be positive, got {interval}")
+    config._xprocess_sampler = ResourceSampler(
+        lambda: _sampled_processes(config),
+        interval,
+        max_samples=int(config.getini("xprocess_sample_max")),
+    ).start()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    # samples are attributed to the test running when they are taken
+    sampler = getattr(item.config, "_xprocess_sampler", None)
+    if sampler is not None:
+        sampler.test = item.nodeid
+    yield
+    if sampler is not None:
+        sampler.test = None
+
+
+def pytest_sessionfinish(session):
+    if _startup_regressions(session.config) and session.exitstatus == 0:
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+    watchdog = getattr(session.config, "_xprocess_watchdog", None)
+    if watchdog is not None:
+        watchdog.stop()
+    sampler = getattr(session.config, "_xprocess_sampler", None)
+    if sampler is None:
+        return
+    sampler.stop()
+    path = session.config.getoption("xsample_json", None)
+    if path:
+        sampler.dump(path)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    regressions = _startup_regressions(config)
+    if regressions:
+        terminalreporter.section("xprocess startup regressions", red=True)
+        for name, duration, baseline in regressions:
+            terminalreporter.write_line(
+                f"{name} took {duration:.3f}s to start, {duration / baseline:.1f} "
+                f"times its median of {baseline:.3f}s"
+            )
+    watchdog = getattr(config, "_xprocess_watchdog", None)
+    if watchdog is not None and watchdog.crashes:
+        terminalreporter.section("xprocess crashes", red=True)
+        for line in watchdog.summary():
+            terminalreporter.write_line(line)
+    sampler = getattr(config, "_xprocess_sampler", None)
+    if sampler is None:
+        return
+    terminalreporter.section("xprocess resource usage")
+    for line in sampler.summary():
+        terminalreporter.write_line(line)
+
+
+def _declared_processes(config):
+    declared = {}
+    for line in config.getini("xprocess_prestart"):
+        name, sep, target = line.partition("=")
+        module, colon, attr = target.strip().partition(":")
+        if not (sep and colon):
+            raise pytest.UsageError(
+                f"invalid xprocess_prestart line {line!r}, "
+                "expected 'name = module:ProcessStarterSubclass'"
+            )
+        starter = importlib.import_module(module)
+        for part in attr.split("."):
+            starter = getattr(starter, part)
+        declared[name.strip()] = starter
+    for processes in config.hook.pytest_xprocess_declare(config=config):
+        declared.update(processes)
+    return declared
+
+
+def _prestart(config):
+    if config.option.xkill or config.option.xshow or config.option.xstats:
+        return
+    # pytest-xdist workers start processes, not the controller
+    if config.pluginmanager.hasplugin("dsession"):
+        return
+    declared = _declared_processes(config)
+    if not declared:
+        return
+    config._xprocess = XProcess(config, getrootdir(config))
+    config._xprocess_prestarting = True
+    config._xprocess.prestart(declared)
+
+
+def pytest_collection_finish(session):
+    if not getattr(session.config, "_xprocess_prestarting", False):
+        return
+    # only keep the declared processes selected tests need
+    needed = set()
+    if not session.config.option.collectonly:
+        for item in session.items:
+            for marker in item.iter_markers("xprocess"):
+                needed.update(marker.args)
+    session.config._xprocess.cancel_prestart(keep=needed)
 
 
 def pytest_unconfigure(config):
+    if getattr(config, "_xprocess_prestarting", False):
+        config._xprocess.__exit__(None, None, None)
     verbosity_level = config.getoption("verbose")
     if verbosity_level >= 1:
         print(
@@ -85,7 +374,14 @@ def pytest_unconfigure(config):
 
 
 def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "xprocess(*names): the test needs the processes declared under these "
+        "names, which are otherwise not started in the background, and fails "
+        "right away if --xwatchdog found one of them crashed",
+    )
     config.pluginmanager.register(InterruptionHandler())
+    _prestart(config)
 
 
 class InterruptionHandler:
@@ -106,9 +402,11 @@ class InterruptionHandler:
         except AttributeError:
             pass
         else:
-            for info, terminate_on_interrupt in self.info_objects():
-                if terminate_on_interrupt:
-                    info.terminate()
+            terminate_all(
+                info
+                for info, terminate_on_interrupt in self.info_objects()
+                if terminate_on_interrupt
+            )
             xprocess._force_clean_up()
 
     def pytest_keyboard_interrupt(self, excinfo):
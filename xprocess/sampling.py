@@ -0,0 +1,197 @@
+import collections
+import json
+import threading
+import time
+
+import psutil
+
+from .logs import format_size
+
+Sample = collections.namedtuple(
+    "Sample", "time test name pids cpu_percent rss fds threads"
+)
+
+
+class ProcessUsage:
+    """Resource usage of the process tree of a single process while a
+    single test was running."""
+
+    def __init__(self, test, name, rss_before):
+        self.test = test
+        self.name = name
+        self.samples = 0
+        self.rss_before = rss_before
+        self.rss_after = rss_before
+        self.rss_peak = 0
+        self.cpu_total = 0
+        self.fds_peak = 0
+        self.threads_peak = 0
+
+    @property
+    def rss_growth(self):
+        return self.rss_after - self.rss_before
+
+    @property
+    def cpu_mean(self):
+        return self.cpu_total / self.samples if self.samples else 0
+
+    def add(self, sample):
+        self.samples += 1
+        self.rss_after = sample.rss
+        self.rss_peak = max(self.rss_peak, sample.rss)
+        self.cpu_total += sample.cpu_percent
+        self.fds_peak = max(self.fds_peak, sample.fds or 0)
+        self.threads_peak = max(self.threads_peak, sample.threads)
+
+    def asdict(self):
+        return {
+            "test": self.test,
+            "process": self.name,
+            "samples": self.samples,
+            "rss_before": self.rss_before,
+            "rss_after": self.rss_after,
+            "rss_growth": self.rss_growth,
+            "rss_peak": self.rss_peak,
+            "cpu_mean": round(self.cpu_mean, 1),
+            "fds_peak": self.fds_peak,
+            "threads_peak": self.threads_peak,
+        }
+
+
+class ResourceSampler:
+    """Background thread periodically recording the CPU usage, RSS, open
+    file descriptors and threads of the process trees of started processes.
+    Samples are attributed to the test running when they were taken, which
+    is set through ``test``.
+
+    @param processes: callable returning a dict mapping process names to
+                      their PIDs, called on every sample.
+    @param interval: seconds between two samples.
+    @param max_samples: number of most recent samples kept in ``samples``,
+                        per test usage is aggregated as samples are taken."""
+
+    def __init__(self, processes, interval=1.0, max_samples=10000):
+        self.processes = processes
+        self.interval = interval
+        self.samples = collections.deque(maxlen=max_samples)
+        # ProcessUsage for each (test, process name), in order of appearance
+        self.usage = {}
+        self.test = None
+        # time spent sampling, in seconds
+        self.overhead = 0
+        self._procs = {}
+        self._last_rss = {}
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __repr__(self):
+        return "<ResourceSampler interval={} samples={}>".format(
+            self.interval, len(self.samples)
+        )
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="xprocess-sampler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        """Take a sample of every process tree."""
+        start = time.perf_counter()
+        now = time.time()
+        test = self.test
+        seen = set()
+        for name, pid in sorted(self.processes().items()):
+            sample = self._sample_tree(now, test, name, pid, seen)
+            if sample is None:
+                continue
+            self.samples.append(sample)
+            key = (test, name)
+            if key not in self.usage:
+                rss_before = self._last_rss.get(name, sample.rss)
+                self.usage[key] = ProcessUsage(test, name, rss_before)
+            self.usage[key].add(sample)
+            self._last_rss[name] = sample.rss
+        # forget processes which are gone
+        for pid in self._procs.keys() - seen:
+            del self._procs[pid]
+        self.overhead += time.perf_counter() - start
+
+    def _sample_tree(self, now, test, name, pid, seen):
+        try:
+            root = self._proc(pid)
+            tree = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return None
+        cpu = rss = fds = threads = 0
+        pids = []
+        for proc in tree:
+            proc = self._proc(proc.pid, proc)
+            try:
+                with proc.oneshot():
+                    # relative to the previous sample of the same process
+                    cpu += proc.cpu_percent()
+                    rss += proc.memory_info().rss
+                    threads += proc.num_threads()
+                    if hasattr(proc, "num_fds"):
+                        fds += proc.num_fds()
+            except psutil.Error:
+                continue
+            pids.append(proc.pid)
+            seen.add(proc.pid)
+        if not pids:
+            return None
+        return Sample(now, test, name, pids, cpu, rss, fds, threads)
+
+    def _proc(self, pid, proc=None):
+        # cpu_percent needs the same Process instance between samples
+        cached = self._procs.get(pid)
+        if cached is None or not cached.is_running():
+            cached = self._procs[pid] = proc or psutil.Process(pid)
+        return cached
+
+    def top(self, n=10):
+        """Return the ProcessUsage instances of the ``n`` tests during which
+        process trees grew the most, biggest growth first."""
+        usage = [u for u in self.usage.values() if u.test is not None]
+        usage.sort(key=lambda u: (u.rss_growth, u.rss_peak), reverse=True)
+        return usage[:n]
+
+    def summary(self, n=10):
+        """Return the lines of a human readable report of the top offenders."""
+        lines = []
+        for usage in self.top(n):
+            growth = format_size(abs(usage.rss_growth))
+            sign = "-" if usage.rss_growth < 0 else "+"
+            lines.append(
+                f"rss {sign}{growth} peak {format_size(usage.rss_peak)} "
+                f"cpu {usage.cpu_mean:.0f}% fds {usage.fds_peak} "
+                f"threads {usage.threads_peak} {usage.name} {usage.test}"
+            )
+        lines.append(
+            f"{len(self.samples)} samples taken every {self.interval}s, "
+            f"sampling took {self.overhead:.2f}s"
+        )
+        return lines
+
+    def dump(self, path):
+        """Write the samples and per test usage to ``path`` as JSON."""
+        data = {
+            "interval": self.interval,
+            "overhead": self.overhead,
+            "samples": [sample._asdict() for sample in self.samples],
+            "tests": [usage.asdict() for usage in self.usage.values()],
+        }
+        with open(str(path), "w") as f:
+            json.dump(data, f, indent=2)
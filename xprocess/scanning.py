@@ -0,0 +1,112 @@
+import collections
+import re
+
+ScanMatch = collections.namedtuple("ScanMatch", "line end error_pattern")
+
+
+def compile_bytes(pattern):
+    """Compile a str pattern, or a compiled one, into a bytes regex whose
+    ``^`` and ``$`` match at the start and end of every line."""
+    flags = re.MULTILINE
+    if isinstance(pattern, re.Pattern):
+        flags |= pattern.flags & ~re.UNICODE
+        pattern = pattern.pattern
+    if isinstance(pattern, str):
+        pattern = pattern.encode("utf-8", "surrogateescape")
+    return re.compile(pattern, flags)
+
+
+def compile_text(pattern):
+    """Compile a str pattern, or a compiled one, into a regex whose ``^``
+    and ``$`` match at the start and end of every line."""
+    if isinstance(pattern, re.Pattern):
+        return re.compile(pattern.pattern, pattern.flags | re.MULTILINE)
+    return re.compile(pattern, re.MULTILINE)
+
+
+def search_lines(pattern, text):
+    """Return (match, end) for the first line of ``text`` matching
+    ``pattern``, end being the offset after that line, (None, None) if no
+    line matches. The text is searched as a whole with ``compile_text``,
+    lines found that way are only matched one by one, e.g. when the
+    pattern spans several lines.
+
+    @return: re.Match of ``pattern`` on the matching line, and its end."""
+    regex = compile_text(pattern)
+    pos = 0
+    while True:
+        found = regex.search(text, pos)
+        if found is None:
+            return None, None
+        start = text.rfind("\n", 0, found.start()) + 1
+        if start == len(text):
+            return None, None
+        end = text.find("\n", start) + 1 or len(text)
+        match = re.search(pattern, text[start:end])
+        if match is not None:
+            return match, end
+        pos = end
+
+
+class LogScanner:
+    """Finds the first line of a log matching a pattern, or one of a list
+    of error patterns, as the log is fed to it in binary chunks of any size.
+
+    Chunks are searched as a whole with a single precompiled bytes regex
+    instead of decoding and matching the log line by line. Only complete
+    lines are searched: the incomplete line a chunk ends with is carried
+    over to the next one, so lines spanning chunk boundaries are matched
+    like any other.
+
+    @ivar end: offset, relative to the first byte fed, up to which the log
+    has been searched."""
+
+    def __init__(self, pattern, error_patterns=()):
+        self.pattern = compile_bytes(pattern)
+        self.error_patterns = [compile_bytes(p) for p in error_patterns]
+        self.end = 0
+        self._partial = b""
+
+    def feed(self, data, final=False):
+        """Search ``data``, appended to what has been fed before, and return
+        a ScanMatch for the first line matching the pattern or an error
+        pattern, None if there is none. Lines following a match are searched
+        by the next call, which can be given no data.
+
+        @param final: also search the trailing incomplete line, once
+                      nothing is going to be appended to it, e.g. when the
+                      process has exited. A line still being written may
+                      match a pattern it will not match once complete."""
+        data = self._partial + data
+        cut = len(data) if final else data.rfind(b"\n") + 1
+        found = self._search(data, cut)
+        consumed = data.rfind(b"\n", 0, cut) + 1 if found is None else found.end
+        self._partial = data[consumed:]
+        self.end += consumed
+        if found is not None:
+            found = found._replace(end=self.end)
+        return found
+
+    def _search(self, data, cut):
+        best = None
+        match = self.pattern.search(data, 0, cut)
+        if match is not None:
+            best = (self._line_start(data, match), None)
+        for error_pattern in self.error_patterns:
+            match = error_pattern.search(data, 0, cut)
+            if match is None:
+                continue
+            start = self._line_start(data, match)
+            # errors logged up to the line the pattern matched abort startup
+            if best is None or start <= best[0]:
+                best = (start, error_pattern)
+        if best is None:
+            return None
+        start, error_pattern = best
+        end = data.find(b"\n", start, cut)
+        end = cut if end < 0 else end + 1
+        return ScanMatch(data[start:end], end, error_pattern)
+
+    @staticmethod
+    def _line_start(data, match):
+        return data.rfind(b"\n", 0, match.start()) + 1
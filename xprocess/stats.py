@@ -0,0 +1,82 @@
+import statistics
+
+# number of startups kept in the history of each process
+HISTORY_SIZE = 100
+# number of most recent startups compared against older ones by trend()
+TREND_WINDOW = 5
+# startups needed before a regression can be told apart from noise
+MIN_BASELINE = 3
+
+# startup phases, in the order they are reported
+PHASES = ("total", "pattern", "startup_check")
+
+
+def percentile(values, p):
+    """Return the ``p``-th percentile of ``values``, interpolating between
+    the closest ranks."""
+    values = sorted(values)
+    if not values:
+        raise ValueError("percentile of an empty sequence")
+    rank = (len(values) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def baseline(values):
+    """Return the duration new startups are compared to, the median of
+    ``values``, or None if there are too few of them."""
+    if len(values) < MIN_BASELINE:
+        return None
+    return statistics.median(values)
+
+
+def trend(values, window=TREND_WINDOW):
+    """Return how much the median of the last ``window`` values differs
+    from the median of the values preceding them, as a ratio (0.1 means 10%
+    slower). None if there are not enough values."""
+    window = min(window, len(values) // 2)
+    if not window:
+        return None
+    before = statistics.median(values[:-window])
+    if not before:
+        return None
+    return statistics.median(values[-window:]) / before - 1
+
+
+def regressed(history, factor):
+    """Return whether the last startup of ``history`` took more than
+    ``factor`` times the baseline of the startups preceding it."""
+    if not factor or not history:
+        return False
+    reference = baseline([entry["total"] for entry in history[:-1]])
+    return reference is not None and history[-1]["total"] > factor * reference
+
+
+def format_duration(seconds):
+    return f"{seconds:.3f}s"
+
+
+def summarize(name, history, factor=None):
+    """Return lines describing the startup durations recorded in
+    ``history``, one for each startup phase."""
+    lines = []
+    for phase in PHASES:
+        values = [entry[phase] for entry in history if phase in entry]
+        if not values:
+            continue
+        change = trend(values)
+        line = "{} {} {} starts p50 {} p90 {} p99 {} last {} trend {}".format(
+            name,
+            phase,
+            len(values),
+            format_duration(percentile(values, 50)),
+            format_duration(percentile(values, 90)),
+            format_duration(percentile(values, 99)),
+            format_duration(values[-1]),
+            "n/a" if change is None else f"{change:+.0%}",
+        )
+        if phase == "total" and regressed(history, factor):
+            line += " REGRESSED"
+        lines.append(line)
+    return lines
@@ -0,0 +1,111 @@
+import asyncio
+import ctypes.util
+import os
+import select
+import sys
+import time
+
+# inotify(7) constants, see <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+
+
+def _load_inotify():
+    """Return libc if it exposes the inotify API, None otherwise."""
+    if not sys.platform.startswith("linux"):  # pragma: no cover
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+    except (OSError, AttributeError):  # pragma: no cover
+        return None
+    return libc
+
+
+_libc = _load_inotify()
+
+
+class LogWatcher:
+    """Wait for data to be appended to a file.
+
+    On Linux, waiting is event driven through inotify and returns as soon
+    as the file is written to. Everywhere else, or if inotify is not
+    available (e.g. the per-user watch limit has been reached), waiting
+    falls back to sleeping ``poll_interval`` seconds at most, so callers
+    should always re-read the file after ``wait`` returns."""
+
+    poll_interval = 0.1
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+        if _libc is not None and isinstance(path, (str, bytes, os.PathLike)):
+            self.fd = self._add_watch(os.fsencode(path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _add_watch(path):
+        fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:  # pragma: no cover
+            return None
+        if _libc.inotify_add_watch(fd, path, IN_MODIFY | IN_CLOSE_WRITE) < 0:
+            os.close(fd)
+            return None
+        return fd
+
+    @property
+    def event_driven(self):
+        """Whether waiting is notified by the OS instead of polling."""
+        return self.fd is not None
+
+    def wait(self, timeout):
+        """Block until the file is written to or ``timeout`` seconds have
+        passed, whichever comes first."""
+        timeout = max(timeout, 0)
+        if self.fd is None:
+            time.sleep(min(timeout, self.poll_interval))
+            return
+        poller = select.poll()
+        poller.register(self.fd, select.POLLIN)
+        if poller.poll(timeout * 1000):
+            self._drain()
+
+    async def wait_async(self, timeout):
+        """Asyncio counterpart of ``LogWatcher.wait``."""
+        timeout = max(timeout, 0)
+        if self.fd is None:
+            await asyncio.sleep(min(timeout, self.poll_interval))
+            return
+        loop = asyncio.get_running_loop()
+        written = loop.create_future()
+        loop.add_reader(self.fd, lambda: written.done() or written.set_result(None))
+        try:
+            await asyncio.wait_for(written, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            loop.remove_reader(self.fd)
+        self._drain()
+
+    def _drain(self):
+        # event contents are irrelevant, only the wake up matters
+        try:
+            while os.read(self.fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,258 @@
+import os
+import select
+import signal
+from contextlib import ExitStack
+from time import monotonic
+
+import psutil
+
+
+def terminate_all(infos, *, kill_proc_tree=True, timeout=20, force=False):
+    """Terminate the processes of several XProcessInfo instances at once.
+
+    Unless ``force`` is set, processes still held by other test sessions
+    are only released, as with ``XProcessInfo.terminate``.
+
+    @return: list holding the return code of ``XProcessInfo.terminate``
+             for each of ``infos``."""
+    infos = list(infos)
+    codes = [0] * len(infos)
+    with ExitStack() as stack:
+        if not force:
+            # always lock in the same order, sessions terminating
+            # overlapping sets of processes must not deadlock
+            locked = {str(info.lockpath): info for info in infos if info.pid}
+            for path in sorted(locked):
+                stack.enter_context(locked[path].lock())
+        targets = []
+        for n, info in enumerate(infos):
+            if not info.pid:
+                continue
+            if force:
+                if info.holderspath.check():
+                    info.holderspath.remove()
+            elif info.release_hold():
+                continue
+            targets.append(n)
+            info._mark_terminated()
+        results = terminate_trees(
+            [infos[n]._process() for n in targets], kill_proc_tree, timeout
+        )
+        for n, code in enumerate(results):
+            codes[targets[n]] = code
+            if code == 1:
+                infos[targets[n]]._termination_signal = True
+    return codes
+
+
+def terminate_trees(pids, kill_proc_tree=True, timeout=20):
+    """Terminate the process trees rooted at ``pids`` (PIDs or
+    psutil.Process instances) concurrently.
+
+    Graceful termination is attempted first, starting by the leaves of each
+    tree. All trees are waited on together, so terminating several of them
+    takes about as long as terminating the slowest one. Processes still
+    alive after ``timeout`` seconds are killed, and waited on again for up
+    to ``timeout`` seconds.
+
+    Trees whose root leads its own process group, as processes started by
+    XProcess.ensure do, are signaled as a whole with killpg. This reaches
+    descendants which have been reparented after their parent exited too.
+
+    @return: list of return codes, one for each of ``pids``:
+        0   no process found
+        1   terminated
+        -1  failed to terminate"""
+    codes = [0] * len(pids)
+    trees = {}
+    for n, pid in enumerate(pids):
+        if not pid:
+            continue
+        try:
+            parent = pid if isinstance(pid, psutil.Process) else psutil.Process(pid)
+            if not parent.is_running():
+                continue
+            trees[n] = [parent]
+            if kill_proc_tree:
+                trees[n] += parent.children(recursive=True)
+        except psutil.NoSuchProcess:
+            trees.pop(n, None)
+        except (psutil.Error, ValueError) as err:
+            print(f"Error while terminating process {err}")
+            trees.pop(n, None)
+            codes[n] = -1
+
+    groups = {}
+    if kill_proc_tree:
+        for n, tree in trees.items():
+            pgid = _process_group(tree[0].pid)
+            if pgid is not None:
+                groups[n] = pgid
+
+    failed = set()
+    # attempt graceful termination first
+    for n, tree in trees.items():
+        if not _signal_tree(tree, groups.get(n), signal.SIGTERM):
+            failed.add(n)
+    try:
+        alive = _wait_procs([p for tree in trees.values() for p in tree], timeout)
+
+        # forcefully terminate procs still running
+        for n, tree in trees.items():
+            tree_alive = [p for p in tree if p in alive]
+            if n in groups:
+                # group members unknown to the tree may still be around
+                if not _signal_group(groups[n], signal.SIGKILL):
+                    failed.add(n)
+                tree_alive = [p for p in tree_alive if _pgid(p.pid) != groups[n]]
+            for p in tree_alive:
+                if not _signal_process(p, signal.SIGKILL):
+                    failed.add(n)
+        alive = _wait_procs(alive, timeout)
+    except (psutil.Error, ValueError) as err:
+        print(f"Error while terminating process {err}")
+        return [-1 if n in trees else code for n, code in enumerate(codes)]
+
+    for n, tree in trees.items():
+        left = [p for p in tree if p in alive]
+        if left:  # pragma: no cover
+            print(f"could not terminated process {left}")
+        codes[n] = -1 if left or n in failed else 1
+    return codes
+
+
+def _process_group(pid):
+    """Return the process group led by ``pid``, None if it does not lead
+    one or if it is the group of the current process."""
+    if not hasattr(os, "killpg"):  # pragma: no cover
+        return None
+    pgid = _pgid(pid)
+    if pgid != pid or pgid == os.getpgrp():
+        return None
+    return pgid
+
+
+def _pgid(pid):
+    try:
+        return os.getpgid(pid)
+    except OSError:
+        return None
+
+
+def _signal_tree(tree, pgid, sig):
+    if pgid is None:
+        return all([_signal_process(p, sig) for p in reversed(tree)])
+    ok = _signal_group(pgid, sig)
+    # descendants may have moved to process groups of their own
+    others = [p for p in reversed(tree[1:]) if _pgid(p.pid) not in (pgid, None)]
+    return all([_signal_process(p, sig) for p in others]) and ok
+
+
+def _signal_group(pgid, sig):
+    try:
+        os.killpg(pgid, sig)
+    except ProcessLookupError:
+        pass
+    except OSError as err:
+        print(f"Error while terminating process group {pgid}: {err}")
+        return False
+    return True
+
+
+def _signal_process(p, sig):
+    try:
+        p.send_signal(sig)
+    except psutil.NoSuchProcess:
+        pass
+    except psutil.Error as err:
+        print(f"Error while terminating process {err}")
+        return False
+    return True
+
+
+def _wait_procs(procs, timeout):
+    """Wait up to ``timeout`` seconds for ``procs`` to terminate and return
+    the ones still alive. Zombies count as terminated: processes started by
+    another test session can only be reaped by that session.
+
+    On Linux, pidfds notify about the exit of every process at once. Other
+    platforms poll the processes with psutil."""
+    if timeout < 0:
+        raise ValueError(f"timeout must be a positive number, got {timeout}")
+    procs = list(procs)
+    pidfds = _open_pidfds(procs)
+    if pidfds is None:
+        return _poll_procs(procs, timeout)
+    try:
+        return _wait_pidfds(pidfds, timeout)
+    finally:
+        for fd in pidfds:
+            os.close(fd)
+
+
+def _open_pidfds(procs):
+    """Return a dict mapping a pidfd to each of the processes in ``procs``
+    still running, or None if pidfds are not supported."""
+    if not hasattr(os, "pidfd_open"):  # pragma: no cover
+        return None
+    pidfds = {}
+    for proc in procs:
+        try:
+            fd = os.pidfd_open(proc.pid)
+        except ProcessLookupError:
+            continue
+        except OSError:  # pragma: no cover
+            # e.g. kernels older than 5.3
+            for fd in pidfds:
+                os.close(fd)
+            return None
+        # the pid may have been reused before the pidfd was opened,
+        # psutil compares the creation time of the process
+        if proc.is_running():
+            pidfds[fd] = proc
+        else:
+            os.close(fd)
+    return pidfds
+
+
+def _wait_pidfds(pidfds, timeout):
+    deadline = monotonic() + timeout
+    poller = select.poll()
+    for fd in pidfds:
+        poller.register(fd, select.POLLIN)
+    alive = dict(pidfds)
+    while alive:
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            break
+        # pidfds become readable once their process has terminated
+        for fd, _ in poller.poll(max(int(remaining * 1000), 1)):
+            poller.unregister(fd)
+            _reap(alive.pop(fd).pid)
+    return list(alive.values())
+
+
+def _reap(pid):
+    # collect the exit status of our own children, as psutil does
+    try:
+        os.waitpid(pid, os.WNOHANG)
+    except ChildProcessError:
+        pass
+
+
+def _poll_procs(procs, timeout):
+    deadline = monotonic() + timeout
+    alive = list(procs)
+    while alive:
+        _, alive = psutil.wait_procs(alive, timeout=min(0.1, timeout))
+        alive = [p for p in alive if not _is_zombie(p)]
+        if monotonic() >= deadline:
+            break
+    return alive
+
+
+def _is_zombie(proc):
+    try:
+        return proc.status() == psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return True
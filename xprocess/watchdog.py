@@ -0,0 +1,152 @@
+import collections
+import threading
+import time
+
+from .xprocess import _read_log_tail
+
+
+class Crash(
+    collections.namedtuple("Crash", "name pid returncode log_tail time restarted")
+):
+    """A process found to have exited without being terminated.
+
+    @ivar returncode: exit code of the process, None if it has not been
+                      started by the current test session.
+    @ivar log_tail: last lines written by the process to its log file.
+    @ivar time: when the crash has been noticed, as returned by time.time().
+    @ivar restarted: whether the process has been started again, see
+                     ProcessStarter.restart_on_crash."""
+
+    __slots__ = ()
+
+    @property
+    def headline(self):
+        msg = f"{self.name} (pid {self.pid}) crashed"
+        if self.returncode is not None:
+            msg += f" with exit code {self.returncode}"
+        return msg
+
+    def __str__(self):
+        msg = f"process {self.headline}"
+        if self.log_tail:
+            msg += "\nlast lines of process log:\n" + "\n".join(
+                f"    {line}" for line in self.log_tail
+            )
+        return msg
+
+
+class Watchdog:
+    """Background thread periodically checking that the processes ensured
+    by a test session are still running.
+
+    Processes which exited without being terminated, through
+    ``XProcessInfo.terminate`` or by being restarted, are recorded as
+    crashed, and started again as long as the ``restart_on_crash`` budget
+    of their starter allows it.
+
+    @param xprocess: callable returning the XProcess instance of the
+                     session, None if there is none yet.
+    @param interval: seconds between two checks.
+
+    @ivar crashes: every Crash noticed so far, in order.
+    @ivar crashed: name -> Crash of the processes which are still down."""
+
+    def __init__(self, xprocess, interval=1.0):
+        self.xprocess = xprocess
+        self.interval = interval
+        self.crashes = []
+        self.crashed = {}
+        # name -> number of times the process has been started again
+        self.restarts = collections.Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __repr__(self):
+        return "<Watchdog interval={} crashed={}>".format(
+            self.interval, sorted(self.crashed)
+        )
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="xprocess-watchdog", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """Check every process once, restarting the ones which crashed."""
+        xprocess = self.xprocess()
+        if xprocess is None:
+            return
+        watched = self._watched(xprocess)
+        for name in sorted(watched):
+            if self._stopped.is_set():
+                return
+            self._check(xprocess, watched[name])
+
+    @staticmethod
+    def _watched(xprocess):
+        # only processes which have been ready once are watched, and
+        # the newest resources of restarted processes come last
+        watched = {}
+        for xresource in list(xprocess.resources):
+            if xresource.name in xprocess._held:
+                watched[xresource.name] = xresource
+        return watched
+
+    def _check(self, xprocess, xresource):
+        name = xresource.name
+        info = xprocess.getinfo(name)
+        if info.pid is None or info.read_state().get("terminated"):
+            return
+        if info.isrunning():
+            crash = self.crashed.get(name)
+            if crash is not None and crash.pid != info.pid:
+                # started again by the tests
+                del self.crashed[name]
+            return
+        if name in self.crashed:
+            return
+        popen = xresource.popen
+        # the exit status of our own children is collected by poll
+        returncode = popen.poll() if popen and popen.pid == info.pid else None
+        crash = Crash(
+            name,
+            info.pid,
+            returncode,
+            _read_log_tail(str(info.logpath)),
+            time.time(),
+            False,
+        )
+        xprocess.log.debug("%s", crash)
+        budget = getattr(xresource.preparefunc, "restart_on_crash", 0)
+        if self.restarts[name] < budget:
+            self.restarts[name] += 1
+            try:
+                xprocess._ensure(
+                    name, xresource.preparefunc, False, xresource.persist_logs
+                )
+            except Exception as err:
+                xprocess.log.debug("could not restart %s: %s", name, err)
+            else:
+                self.crashes.append(crash._replace(restarted=True))
+                return
+        self.crashes.append(crash)
+        self.crashed[name] = crash
+
+    def summary(self):
+        """Return the lines of a human readable report of the crashes."""
+        return [
+            f"{crash.headline}, {'restarted' if crash.restarted else 'left down'}"
+            for crash in self.crashes
+        ]
@@ -1,21 +1,170 @@
+import asyncio
+import copy
+import hashlib
+import inspect
 import itertools
+import json
 import os
 import re
-import signal
 import subprocess
 import sys
-import time
+import threading
 import traceback
+import uuid
 from abc import ABC
 from abc import abstractmethod
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from contextlib import contextmanager
 from datetime import datetime
 from datetime import timedelta
+from time import monotonic
 from time import sleep
 
 import psutil
 
+from .activation import activation_args
+from .activation import bind_listen_sockets
+from .activation import bound_address
+from .locking import FileLock
+from .logs import archived_logs
+from .logs import BLOCK_DELIMITER_LINE
+from .logs import format_size
+from .logs import log_opener
+from .logs import LogBlockIndex
+from .logs import needs_rotation
+from .logs import rotate_log
+from .logs import XPROCESS_BLOCK_DELIMITER
+from .matching import PatternSet
+from .notify import NotifySocket
+from .pool import XProcessPool
+from .scanning import LogScanner
+from .scanning import search_lines
+from .stats import baseline
+from .stats import HISTORY_SIZE
+from .stats import regressed
+from .stats import summarize
+from .tailing import LogWatcher
+from .termination import terminate_all
+from .termination import terminate_trees
+
+# environment variables set by pytest and its plugins which change from one
+# test to the next, they do not tell whether a process needs a restart
+VOLATILE_ENV = frozenset(
+    (
+        "PYTEST_CURRENT_TEST",
+        "PYTEST_XDIST_TESTRUNUID",
+        "PYTEST_XDIST_WORKER",
+        "PYTEST_XDIST_WORKER_COUNT",
+    )
+)
+
+
+class StartupError(RuntimeError):
+    """Raised when a process fails while xprocess waits for it to start,
+    either because it exited or because it logged a line matching one of
+    the starter's ``error_pattern``.
+
+    @ivar returncode: exit code of the process, None if it was still running,
+                      in which case it has been terminated.
+    @ivar log_tail: last lines written by the process to its log file."""
+
+    returncode = None
+    log_tail = ()
+
+
+def _read_log_tail(path, max_lines=20, max_bytes=64 * 1024):
+    """Return the last lines of the newest block of a process log file."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(f.tell() - max_bytes, 0))
+            data = f.read()
+    except (OSError, TypeError, ValueError):
+        return []
+    text = data.decode("utf-8", errors="surrogateescape")
+    text = text.rpartition(f"{XPROCESS_BLOCK_DELIMITER}\n")[2]
+    return [line for line in text.splitlines() if line.strip()][-max_lines:]
+
+
+class EnsureResult(tuple):
+    """(PID, logfile) pair returned by XProcess.ensure. Further details on
+    the process are available as attributes:
+
+    @ivar addresses: addresses of the listening sockets passed to the
+                     process, see ProcessStarter.listen_sockets.
+    @ivar decision: whether the process has been started, restarted or
+                    reused, and why, see ProcessStarter.fingerprint.
+    @ivar events: MatchEvent for each readiness pattern matched while the
+                  process was started, empty if it has been reused, see
+                  ProcessStarter.patterns.
+    @ivar probes: copies of the readiness probes waited on while the process
+                  was started, recording their attempts, empty if it has
+                  been reused, see ProcessStarter.probes."""
+
+    def __new__(cls, pid, logpath, **details):
+        result = super().__new__(cls, (pid, logpath))
+        result.__dict__.update(details)
+        return result
 
-XPROCESS_BLOCK_DELIMITER = "@@__xproc_block_delimiter__@@"
+    @property
+    def pid(self):
+        return self[0]
+
+    @property
+    def logpath(self):
+        return self[1]
+
+
+def _dump_json(path, data):
+    # write to a temporary file first, readers never see partial content
+    tmppath = f"{path}.{os.getpid()}.{threading.get_ident()}"
+    with open(tmppath, "w") as f:
+        json.dump(data, f)
+    os.replace(tmppath, str(path))
+
+
+def _fingerprint_default(obj):
+    """Make the objects json does not know about part of a fingerprint."""
+    if callable(obj) and hasattr(obj, "__qualname__"):
+        # reprs of functions and classes hold memory addresses
+        return f"{obj.__module__}.{obj.__qualname__}"
+    if isinstance(obj, (set, frozenset)):
+        return sorted(map(repr, obj))
+    return repr(obj)
+
+
+def _release_acquired(future):
+    """Release the lock acquired by ``future`` once nobody waits for it."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().release()
+
+
+def _write_pid(path, pid):
+    # replace the PID file at once, readers never see it empty
+    tmppath = f"{path}.{os.getpid()}.{threading.get_ident()}"
+    with open(tmppath, "w") as f:
+        f.write(str(pid))
+    os.replace(tmppath, str(path))
+
+
+def _is_alive(pid, create_time):
+    """Return whether process ``pid`` is still the one created at
+    ``create_time``, PIDs may be reused once a process has exited."""
+    try:
+        return psutil.Process(pid).create_time() == create_time
+    except psutil.NoSuchProcess:
+        return False
+    except psutil.AccessDenied:  # pragma: no cover
+        return True
+
+
+def _create_time(pid):
+    try:
+        return psutil.Process(pid).create_time()
+    except psutil.NoSuchProcess:
+        return None
 
 
 class XProcessInfo:
@@ -29,15 +178,162 @@ class XProcessInfo:
         self.controldir = path.ensure(name, dir=1)
         self.logpath = self.controldir.join("xprocess.log")
         self.pidpath = self.controldir.join("xprocess.PID")
+        self.statepath = self.controldir.join("xprocess.state")
+        self.lockpath = self.controldir.join("xprocess.lock")
+        self.holderspath = self.controldir.join("xprocess.holders")
+        self.statspath = self.controldir.join("xprocess.stats")
         self.pid = int(self.pidpath.read()) if self.pidpath.check() else None
+        # psutil.Process of pid, see XProcessInfo._process
+        self._proc = None
+        # where XProcessInfo.expect resumes searching the log
+        self._expect_offset = None
 
-    def _signal_process(self, p, sig):
+    def read_state(self):
+        """Return the details persisted about the last started process."""
         try:
-            p.send_signal(sig)
-        except psutil.NoSuchProcess:
-            pass
+            with open(str(self.statepath)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_state(self, **fields):
+        """Update the details persisted about the last started process."""
+        _dump_json(self.statepath, {**self.read_state(), **fields})
+
+    def lock(self):
+        """Return the FileLock serializing starting and terminating this
+        process across test sessions, e.g. pytest-xdist workers."""
+        return FileLock(self.lockpath)
+
+    def holders(self):
+        """Return the PIDs of the live test sessions holding this process,
+        i.e. which have ensured it and not terminated it yet. Must be called
+        with the lock held."""
+        try:
+            with open(str(self.holderspath)) as f:
+                holders = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {
+            int(pid): create_time
+            for pid, create_time in holders.items()
+            if _is_alive(int(pid), create_time)
+        }
+
+    def hold(self):
+        """Register the current test session as holding this process. Must
+        be called with the lock held."""
+        holders = self.holders()
+        holders[os.getpid()] = psutil.Process().create_time()
+        _dump_json(self.holderspath, holders)
+
+    def release_hold(self):
+        """Drop the hold of the current test session on this process. Must
+        be called with the lock held.
+
+        @return: PIDs of the other live test sessions still holding it."""
+        holders = self.holders()
+        holders.pop(os.getpid(), None)
+        if self.holderspath.check():
+            _dump_json(self.holderspath, holders)
+        return holders
+
+    def startup_history(self):
+        """Return the durations of the last startups of this process, oldest
+        first, as dicts mapping startup phases to seconds, see
+        ``ProcessStarter.startup_durations``."""
+        try:
+            with open(str(self.statspath)) as f:
+                history = json.load(f)
+        except (OSError, ValueError):
+            return []
+        return history if isinstance(history, list) else []
+
+    def record_startup(self, durations):
+        """Append the durations of a startup to the history of this process,
+        keeping the last ``stats.HISTORY_SIZE`` ones. Must be called with
+        the lock held."""
+        history = self.startup_history() + [dict(durations)]
+        _dump_json(self.statspath, history[-HISTORY_SIZE:])
+
+    def expect(self, pattern, timeout=10):
+        """Wait for the process to log a line matching ``pattern``, searching
+        only what has been logged after the line matched by the previous call
+        of expect on this instance. The first call searches everything logged
+        since the process was last started.
+
+        Waiting is event driven like startup detection, and each call only
+        reads what has been appended to the log since the previous one, so
+        huge logs are not searched again and again. Will raise TimeoutError
+        if no line matches within ``timeout`` seconds.
+
+        @return: re.Match of ``pattern`` on the matching line."""
+        if self._expect_offset is None:
+            self._expect_offset = (
+                LogBlockIndex(self.logpath).refresh().last_block_start or 0
+            )
+        deadline = monotonic() + timeout
+        with LogWatcher(str(self.logpath)) as watcher:
+            while True:
+                expired = monotonic() >= deadline
+                # checked before reading, an exited process has written
+                # everything by then, including an unterminated last line
+                match = self._expect_once(
+                    pattern, final=expired or not self.isrunning()
+                )
+                if match is not None:
+                    return match
+                if expired:
+                    raise TimeoutError(
+                        f"pattern {pattern!r} was not logged by {self.name} "
+                        f"within {timeout} seconds"
+                    )
+                watcher.wait(min(max(deadline - monotonic(), 0), 1))
+
+    def _expect_once(self, pattern, final=False):
+        """Search what has been logged since the last call for ``pattern``,
+        advancing the offset expect resumes from.
+
+        @param final: also search the incomplete line the log ends with,
+                      once nothing is going to be appended to it. It is
+                      searched again next time otherwise."""
+        try:
+            f = open(str(self.logpath), "rb")
+        except OSError:
+            return None
+        with f:
+            if os.fstat(f.fileno()).st_size < self._expect_offset:
+                # the log has been truncated by a restart
+                self._expect_offset = 0
+            f.seek(self._expect_offset)
+            pending = b""
+            while True:
+                chunk = f.read(LogBlockIndex.chunk_size)
+                data = pending + chunk
+                cut = len(data) if final and not chunk else data.rfind(b"\n") + 1
+                # decoded rather than matched as bytes, so that str patterns
+                # keep their meaning on non-ASCII text, e.g. \w or IGNORECASE
+                text = data[:cut].decode("utf-8", errors="surrogateescape")
+                match, end = search_lines(pattern, text)
+                if match is not None:
+                    consumed = text[:end].encode("utf-8", errors="surrogateescape")
+                    self._expect_offset += len(consumed)
+                    return match
+                self._expect_offset += cut
+                pending = data[cut:]
+                if not chunk:
+                    return None
 
-    def terminate(self, *, kill_proc_tree=True, timeout=20):
+    @property
+    def addresses(self):
+        """Addresses of the listening sockets passed to the process, see
+        ``ProcessStarter.listen_sockets``."""
+        return [
+            tuple(address) if isinstance(address, list) else address
+            for address in self.read_state().get("addresses", [])
+        ]
+
+    def terminate(self, *, kill_proc_tree=True, timeout=20, force=False):
         """Recursively terminates process tree.
 
          Attempt graceful termination starting by leaves of process tree.
@@ -64,47 +360,33 @@ class XProcessInfo:
                         When timeout is reached after sending SIGTERM, this
                         method will attempt to SIGKILL the process and
                         return ``-1`` in case the operation times out again.
+        :param force: Terminate the process even if other test sessions (e.g.
+                      other pytest-xdist workers) still hold it. Otherwise
+                      only the hold of the current session is dropped and the
+                      last session holding the process terminates it.
         return codes:
-            0   no work to do
+            0   no work to do, or the process is still held by other sessions
             1   terminated
             -1  failed to terminate"""
 
-        if not self.pid:
-            return 0
-        try:
-            parent = psutil.Process(self.pid)
-        except psutil.NoSuchProcess:
-            return 0
+        return terminate_all(
+            [self], kill_proc_tree=kill_proc_tree, timeout=timeout, force=force
+        )[0]
 
-        try:
-            kill_list = [parent]
-            if kill_proc_tree:
-                kill_list += parent.children(recursive=True)
-
-            # attempt graceful termination first
-            for p in reversed(kill_list):
-                self._signal_process(p, signal.SIGTERM)
-            _, alive = psutil.wait_procs(kill_list, timeout=timeout)
-            alive = [a for a in alive if a.status() != psutil.STATUS_ZOMBIE]
-
-            # forcefully terminate procs still running
-            for p in alive:
-                self._signal_process(p, signal.SIGKILL)
-            _, alive = psutil.wait_procs(kill_list, timeout=timeout)
-            alive = [a for a in alive if a.status() != psutil.STATUS_ZOMBIE]
-
-            # even if termination itself fails,
-            # the signal has been sent to the process
+    def _terminate(self, kill_proc_tree, timeout):
+        """Terminate the process tree, regardless of other test sessions
+        holding it. Must be called with the lock held."""
+        self._mark_terminated()
+        (code,) = terminate_trees([self._process()], kill_proc_tree, timeout)
+        if code == 1:
             self._termination_signal = True
+        return code
 
-            if alive:  # pragma: no cover
-                print(f"could not terminated process {alive}")
-                return -1
-        except (psutil.Error, ValueError) as err:
-            print(f"Error while terminating process {err}")
-            return -1
-        else:
-            return 1
+    def _mark_terminated(self):
+        """Record that the process is terminated on purpose, so that it is
+        not mistaken for a crash, see xprocess.watchdog."""
+        if self.pid is not None and self.read_state().get("pid") == self.pid:
+            self.write_state(terminated=True)
 
     def isrunning(self, ignore_zombies=True):
         """Returns whether the process is running or not.
@@ -115,16 +397,34 @@ class XProcessInfo:
 
         @return: ``True`` if the process is running, ``False`` if it is not."""
 
-        if self.pid is None:
+        proc = self._process()
+        if proc is None:
             return False
         try:
-            proc = psutil.Process(self.pid)
+            return proc.is_running() and (
+                not ignore_zombies or proc.status() != psutil.STATUS_ZOMBIE
+            )
         except psutil.NoSuchProcess:
             return False
 
-        return proc.is_running() and (
-            not ignore_zombies or proc.status() != psutil.STATUS_ZOMBIE
-        )
+    def _process(self):
+        """Return the psutil.Process of the started process, None if it is
+        gone or if its PID has been reused by another process since."""
+        if self.pid is None:
+            return None
+        if self._proc is None or self._proc.pid != self.pid:
+            try:
+                proc = psutil.Process(self.pid)
+            except psutil.NoSuchProcess:
+                return None
+            state = self.read_state()
+            created = state.get("create_time") if state.get("pid") == self.pid else None
+            # xprocess.PID may be stale, only trust it if the process has
+            # been created when the process recorded in the state was
+            if created is not None and proc.create_time() != created:
+                return None
+            self._proc = proc
+        return self._proc
 
 
 class XProcessResources:
@@ -145,6 +445,13 @@ class XProcessResources:
         # used for process management through python's
         # subprocess API
         self.popen = None
+        # NotifySocket of processes started with ProcessStarter.sd_notify
+        self.notify = None
+        # arguments of the XProcess.ensure call, to start the process
+        # again should it crash, see xprocess.watchdog
+        self.name = None
+        self.preparefunc = None
+        self.persist_logs = True
 
     def __del__(self):
         self.release()
@@ -159,6 +466,8 @@ class XProcessResources:
         # in order to avoid ResourceWarnings
         for fhandle in self.fhandles:
             fhandle.close()
+        if self.notify is not None:
+            self.notify.close()
 
         # We should wait on procs exit status if
         # termination signal has been issued
@@ -182,6 +491,21 @@ class XProcess:
         # used to keep all necessary references
         # for proper cleanup before exiting
         self.resources = []
+        # names of the processes held by this session
+        self._held = set()
+        self._pools = []
+        # (name, durations, baseline) of the processes started by this
+        # session, baseline being the median of their previous startups
+        self._startups = []
+        # XProcessInfo instances used by XProcess.expect, which
+        # remember where the next expectation starts
+        self._expecting = {}
+        # name -> (preparefunc, future) of processes started in the
+        # background by XProcess.prestart, until they are ensured
+        self._prestarted = {}
+        self._prestart_executors = []
+        # threads terminating the instances replaced by overlapped restarts
+        self._retiring = []
 
         class Log:
             def debug(self, msg, *args):
@@ -198,12 +522,33 @@ class XProcess:
     def __exit__(self, exc_type, exc_value, tb):
         if exc_type is not None:
             traceback.print_exception(exc_type, exc_value, tb)
+        for executor in self._prestart_executors:
+            executor.shutdown(wait=True)
+        for thread in self._retiring:
+            thread.join()
+        for pool in self._pools:
+            pool.close()
+        # processes are kept running across test runs, but
+        # this session does not need them anymore
+        for name in self._held:
+            info = self.getinfo(name)
+            with info.lock():
+                info.release_hold()
 
     def getinfo(self, name):
         """Return Process Info for the given external process."""
 
         return XProcessInfo(self.rootdir, name)
 
+    def getnotify(self, name):
+        """Return the NotifySocket of the given external process if it has
+        been started with ``ProcessStarter.sd_notify`` during this session,
+        None otherwise."""
+        for xresource in reversed(self.resources):
+            if xresource.info is not None and xresource.info[0].name == name:
+                return xresource.notify
+        return None
+
     def ensure(self, name, preparefunc, restart=False, persist_logs=True):
         """Returns (PID, logfile) from a newly started or already
             running process.
@@ -214,37 +559,290 @@ class XProcess:
         @param preparefunc:
                 A subclass of ProcessStarter.
 
-        @param restart: force restarting the process if it is running.
+        @param restart: force restarting the process if it is running,
+                        unless other test sessions hold it.
+
+        Starting a process is serialized across test sessions (e.g.
+        pytest-xdist workers) by a lock in its control directory: if another
+        session is already starting it, ensure waits for it to be ready and
+        reuses it. Every session ensuring a process holds it until it
+        terminates it, and only the last one actually terminates it, see
+        ``XProcessInfo.terminate``.
+
+        If the process has been started in the background by
+        ``XProcess.prestart`` with the same preparefunc, ensure waits for it
+        to be ready instead, and does not restart it if it has just been
+        started.
 
         @return: (PID, logfile) logfile will be seeked to the end if the
                  server was running, otherwise seeked to the line after
-                 where the waitpattern matched."""
+                 where the waitpattern matched. The returned pair is an
+                 EnsureResult, holding more details on the process."""
+        prestarted = self._take_prestarted(name, preparefunc, restart)
+        if prestarted is not None:
+            return prestarted
+        return self._ensure(name, preparefunc, restart, persist_logs)
+
+    def _ensure(self, name, preparefunc, restart, persist_logs):
+        with self.getinfo(name).lock():
+            info, starter, log_file_handle = self._start(
+                name, preparefunc, restart, persist_logs
+            )
+            if starter is not None:
+                with self._overlapping(info, starter, log_file_handle):
+                    if isinstance(starter, AsyncProcessStarter):
+                        started = asyncio.run(starter.wait(log_file_handle))
+                    else:
+                        started = starter.wait(log_file_handle)
+                    self._check_started(info, starter, started)
+            self._hold(info)
+        return self._result(info, starter)
+
+    async def aensure(self, name, preparefunc, restart=False, persist_logs=True):
+        """Asyncio counterpart of ``XProcess.ensure``.
+
+        Startup detection of an ``AsyncProcessStarter`` runs on the calling
+        event loop, so several processes can be started and probed
+        concurrently with ``asyncio.gather``. Plain ``ProcessStarter``
+        subclasses are waited on in the loop's default executor.
+
+        @return: (PID, logfile), see ``XProcess.ensure``."""
+        loop = asyncio.get_running_loop()
+        # waiting for the lock and terminating a previous
+        # instance may block, keep them off the loop
+        acquiring = loop.run_in_executor(None, self.getinfo(name).lock().acquire)
+        try:
+            lock = await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # the executor thread still gets the lock, which would be
+            # held for good and deadlock every later start of the process
+            acquiring.add_done_callback(_release_acquired)
+            raise
+        try:
+            info, starter, log_file_handle = await loop.run_in_executor(
+                None, self._start, name, preparefunc, restart, persist_logs
+            )
+            if starter is not None:
+                with self._overlapping(info, starter, log_file_handle):
+                    if isinstance(starter, AsyncProcessStarter):
+                        started = await starter.wait(log_file_handle)
+                    else:
+                        started = await loop.run_in_executor(
+                            None, starter.wait, log_file_handle
+                        )
+                    self._check_started(info, starter, started)
+            self._hold(info)
+        finally:
+            lock.release()
+        return self._result(info, starter)
+
+    def prestart(self, starters):
+        """Start processes in the background and return right away, so
+        that they start while the test session is busy with something else,
+        such as collecting tests. ``XProcess.ensure`` then waits for them to
+        be ready. Processes are started as by ``XProcess.ensure_all``, taking
+        ``depends_on`` declarations into account.
+
+        @param starters: mapping or iterable of (name, preparefunc) pairs,
+                         where each preparefunc is a subclass of ProcessStarter."""
+        starters = dict(starters)
+        graph = self._dependency_graph(starters)
+        # each process waits for its dependencies in a thread of its own,
+        # and dependencies are submitted first, so this can not deadlock
+        executor = ThreadPoolExecutor(
+            max_workers=max(len(starters), 1), thread_name_prefix="xprocess-prestart"
+        )
+        self._prestart_executors.append(executor)
+        pending = {name: set(deps) for name, deps in graph.items()}
+        while pending:
+            for name in [n for n, deps in pending.items() if not deps]:
+                del pending[name]
+                deps = [self._prestarted[dep][1] for dep in graph[name]]
+                future = executor.submit(self._prestart, name, starters[name], deps)
+                self._prestarted[name] = (starters[name], future)
+                for remaining in pending.values():
+                    remaining.discard(name)
+
+    def _prestart(self, name, preparefunc, deps):
+        for dep in deps:
+            dep.result()
+        return self._ensure(name, preparefunc, False, True)
+
+    def _take_prestarted(self, name, preparefunc, restart):
+        """Wait for the prestarted process ``name`` and return its
+        EnsureResult, None if it has not been prestarted by ``preparefunc``
+        or if it has to be restarted."""
+        declared, future = self._prestarted.pop(name, (None, None))
+        if future is None:
+            return None
+        try:
+            result = future.result()
+        except Exception:
+            if declared is preparefunc:
+                raise
+            return None
+        if declared is not preparefunc:
+            # ensure compares the fingerprints of both starters
+            return None
+        if restart and result.decision.startswith("reused"):
+            return None
+        return result
+
+    def cancel_prestart(self, keep=()):
+        """Cancel the background start of the prestarted processes which
+        are not in ``keep``, nor dependencies of those. Processes already
+        started by ``XProcess.prestart`` are terminated as soon as they are
+        ready, running processes it merely reused are left alone."""
+        keep = set(keep)
+        needed = set()
+        while keep:
+            name = keep.pop()
+            if name in needed or name not in self._prestarted:
+                continue
+            needed.add(name)
+            keep.update(getattr(self._prestarted[name][0], "depends_on", ()))
+        for name in set(self._prestarted) - needed:
+            _, future = self._prestarted.pop(name)
+            if not future.cancel():
+                future.add_done_callback(
+                    lambda future, name=name: self._discard_prestarted(name, future)
+                )
+
+    def _discard_prestarted(self, name, future):
+        if future.exception() is not None:
+            return
+        info = self.getinfo(name)
+        self._held.discard(name)
+        if future.result().decision.startswith("reused"):
+            with info.lock():
+                info.release_hold()
+        else:
+            info.terminate()
+
+    def expect(self, name, pattern, timeout=10):
+        """Wait for the given external process to log a line matching
+        ``pattern``, see ``XProcessInfo.expect``.
+
+        Each process has its own offset, remembered across calls: the first
+        expectation only searches what has been logged after the process has
+        been detected as started by ``XProcess.ensure`` (or since it was last
+        started, if it has been ensured by another session), and the next
+        ones what has been logged after the line which matched the previous
+        one. Restarting the process resets the offset.
+
+        @return: re.Match of ``pattern`` on the matching line."""
+        info = self._expecting.get(name)
+        if info is None:
+            info = self._expecting[name] = self.getinfo(name)
+            handle = self.config.__dict__.get("_extlogfiles", {}).get(name)
+            if handle is not None:
+                try:
+                    # left after the line startup has been detected by
+                    info._expect_offset = handle.tell()
+                except (OSError, ValueError):
+                    pass
+        return info.expect(pattern, timeout)
+
+    def pool(self, name, preparefunc, size=1, persist_logs=True):
+        """Start ``size`` instances of a process in the background and
+        return an XProcessPool leasing them to tests.
+
+        Instances are named ``<name>-pool-<n>``, each one with its own
+        control directory. They are terminated when the pool is closed,
+        at the latest at the end of the test session.
+
+        @param preparefunc: A subclass of ProcessStarter.
+
+        @return: XProcessPool instance."""
+        pool = XProcessPool(self, name, preparefunc, size, persist_logs)
+        self._pools.append(pool)
+        return pool
+
+    def _hold(self, info):
+        info.hold()
+        self._held.add(info.name)
+
+    def _result(self, info, starter=None):
+        return EnsureResult(
+            info.pid,
+            info.logpath,
+            addresses=info.addresses,
+            decision=info.read_state().get("decision"),
+            events=list(starter.events) if starter is not None else [],
+            probes=list(starter.waited_probes) if starter is not None else [],
+        )
+
+    def _start(self, name, preparefunc, restart, persist_logs):
+        """Start the process unless it is already running and return
+        (info, starter, log_file_handle). starter is None when a running
+        process is reused, in which case there is nothing to wait for."""
         from subprocess import Popen, STDOUT
 
         xresource = XProcessResources(self.proc_wait_timeout)
+        xresource.name, xresource.preparefunc = name, preparefunc
+        xresource.persist_logs = persist_logs
         self.resources.append(xresource)
 
         info = self.getinfo(name)
-        if not restart and not info.isrunning():
-            restart = True
+        controldir = info.controldir.ensure(dir=1)
+        starter = preparefunc(controldir, self)
+        fingerprint = starter.fingerprint()
+        restart, decision = self._restart_decision(info, fingerprint, restart)
+        self.log.debug("%s %s", name, decision)
 
         if restart:
-            if info.pid is not None:
-                info.terminate()
+            if starter.restart_overlap and info.isrunning():
+                # terminated once the new instance is ready
+                replaced = info._process()
+            else:
+                replaced = None
+                if info.pid is not None:
+                    # the lock is held already
+                    info._terminate(kill_proc_tree=True, timeout=20)
+            self._expecting.pop(name, None)
 
             # TODO: after droping py module, review this and break
             # it down into more readable chunks, possibly extracting pieces
             # into internal methods would make things more clear too
-            controldir = info.controldir.ensure(dir=1)
-            starter = preparefunc(controldir, self)
             args = [str(x) for x in starter.args]
             self.log.debug("%s$ %s", controldir, " ".join(args))
-            if persist_logs:
+            log_index = LogBlockIndex(info.logpath)
+            if persist_logs or replaced is not None:
+                # the replaced instance of an overlapped restart still
+                # writes to the log, it is rotated or truncated by a later
+                # restart and the new instance starts a block of its own
+                if replaced is None and needs_rotation(
+                    info.logpath, starter.log_max_bytes, starter.log_max_blocks
+                ):
+                    rotate_log(
+                        info.logpath, starter.log_backup_count, starter.log_compression
+                    )
                 stdout = open(str(info.logpath), "a+b", 0)
-                stdout.write(bytes(f"{XPROCESS_BLOCK_DELIMITER}\n", "utf8"))
+                log_index.refresh()
+                offset = os.fstat(stdout.fileno()).st_size
+                stdout.write(BLOCK_DELIMITER_LINE)
+                log_index.append(offset)
             else:
-                stdout = open(str(info.logpath), "wb", 0)
+                # append mode, sd_notify status lines may be written
+                # to the log while the process is running
+                stdout = open(str(info.logpath), "ab", 0)
+                stdout.truncate(0)
+                log_index.remove()
             kwargs = {"env": starter.env}
+            if starter.sd_notify:
+                # the replaced instance of an overlapped restart still
+                # notifies through its own socket until it has stopped
+                sockname = "notify.sock"
+                if replaced is not None:
+                    sockname = f"notify-{uuid.uuid4().hex[:8]}.sock"
+                xresource.notify = starter.notify_socket = NotifySocket(
+                    controldir.join(sockname), info.logpath
+                )
+                env = dict(os.environ if starter.env is None else starter.env)
+                env["NOTIFY_SOCKET"] = xresource.notify.address
+                if starter.watchdog_interval is not None:
+                    env["WATCHDOG_USEC"] = str(int(starter.watchdog_interval * 1e6))
+                kwargs["env"] = env
             popen_kwargs = {
                 "cwd": str(controldir),
                 "stdout": stdout,
@@ -257,61 +855,234 @@ class XProcess:
                 sinfo.wShowWindow |= subprocess.SW_HIDE
             else:
                 kwargs["close_fds"] = True
-                kwargs["preexec_fn"] = os.setpgrp  # no CONTROL-C
+                # own process group (no CONTROL-C, terminated with killpg),
+                # without a preexec_fn subprocess can spawn with vfork
+                if sys.version_info >= (3, 11):
+                    kwargs["process_group"] = 0
+                else:
+                    kwargs["start_new_session"] = True
+
+            listen_sockets = bind_listen_sockets(starter.listen_sockets)
+            if listen_sockets:
+                args = activation_args(args, listen_sockets)
+                popen_kwargs["pass_fds"] = (
+                    *popen_kwargs.get("pass_fds", ()),
+                    *(sock.fileno() for sock in listen_sockets),
+                )
 
             # keep references of all popen and info objects for cleanup
             xresource.info = (info, starter.terminate_on_interrupt)
-            xresource.popen = Popen(args, **popen_kwargs, **kwargs)
-
+            try:
+                xresource.popen = starter.popen = Popen(args, **popen_kwargs, **kwargs)
+            finally:
+                # the process holds its own copies of the sockets
+                addresses = [bound_address(sock) for sock in listen_sockets]
+                for sock in listen_sockets:
+                    sock.close()
+
+            starter._phase_start = monotonic()
             info.pid = pid = xresource.popen.pid
-            info.pidpath.write(str(pid))
+            state = dict(
+                pid=pid,
+                create_time=_create_time(pid),
+                addresses=addresses,
+                fingerprint=fingerprint,
+                decision=decision,
+                terminated=False,
+            )
+            if replaced is None:
+                self._publish(info, state)
+            else:
+                # the previous instance is still the one recorded
+                starter._overlapped = (replaced, state)
             self.log.debug("process %r started pid=%s", name, pid)
             stdout.close()
+        else:
+            info.write_state(decision=decision)
 
         log_file_handle = open(info.logpath, errors="surrogateescape")
         xresource.fhandles.append(log_file_handle)
-        pytest_extlogfiles = self.config.__dict__.setdefault("_extlogfiles", {})
-        pytest_extlogfiles[name] = log_file_handle
+        if starter._overlapped is None:
+            pytest_extlogfiles = self.config.__dict__.setdefault("_extlogfiles", {})
+            pytest_extlogfiles[name] = log_file_handle
 
-        if persist_logs:
-            process_log_block_handle = open(info.logpath, errors="surrogateescape")
-            xresource.fhandles.append(process_log_block_handle)
-            self._skip_previous_log_blocks(process_log_block_handle, log_file_handle)
+        if restart and (persist_logs or starter._overlapped is not None):
+            self._skip_previous_log_blocks(info, log_file_handle)
 
         if not restart:
             log_file_handle.seek(0, 2)
-        else:
-            if not starter.wait(log_file_handle):
-                raise RuntimeError(
-                    "Could not start process {}, the specified "
-                    "log pattern was not found within {} lines.".format(
-                        name, starter.max_read_lines
-                    )
-                )
-            self.log.debug("%s process startup detected", name)
-
-        return info.pid, info.logpath
-
-    def _skip_previous_log_blocks(self, log_block_handle, log_file_handle):
-        lines = [line for line in log_block_handle]
-        if not lines:  # cut it short if nothing to skip
+            return info, None, log_file_handle
+        return info, starter, log_file_handle
+
+    @staticmethod
+    def _publish(info, state):
+        """Record ``state`` of a newly started process, pointing the PID
+        file to it."""
+        info.write_state(**state)
+        _write_pid(info.pidpath, state["pid"])
+
+    @contextmanager
+    def _overlapping(self, info, starter, log_file_handle):
+        """Complete an overlapped restart, see ProcessStarter.restart_overlap,
+        once the new instance is ready: the PID file, state and log handle
+        are swapped over to it and the previous instance is terminated in
+        the background. The new instance is terminated instead if it fails
+        to start, leaving the previous one in place."""
+        if starter._overlapped is None:
+            yield
             return
-        proc_block_counter = sum(
-            1 for line in lines if XPROCESS_BLOCK_DELIMITER in line
+        replaced, state = starter._overlapped
+        try:
+            yield
+        except BaseException:
+            terminate_trees([starter.popen.pid])
+            info.pid = replaced.pid
+            raise
+        self._publish(info, state)
+        pytest_extlogfiles = self.config.__dict__.setdefault("_extlogfiles", {})
+        pytest_extlogfiles[info.name] = log_file_handle
+        thread = threading.Thread(
+            target=terminate_trees,
+            args=([replaced],),
+            name=f"xprocess-retire-{info.name}",
+            daemon=True,
         )
-        for line in log_file_handle:
-            if XPROCESS_BLOCK_DELIMITER in line:
-                proc_block_counter -= 1
-            if proc_block_counter <= 0:
-                break
+        thread.start()
+        self._retiring.append(thread)
+        self.log.debug("%s terminating replaced pid=%s", info.name, replaced.pid)
+
+    def _restart_decision(self, info, fingerprint, restart):
+        """Return (restart, decision), whether the process has to be
+        (re)started and a description of why (not)."""
+        running = info.isrunning()
+        if not running:
+            return True, "started"
+        if not restart:
+            recorded = info.read_state().get("fingerprint")
+            if recorded is None:
+                # started by an older version of xprocess
+                return False, "reused (no fingerprint recorded)"
+            if recorded == fingerprint:
+                return False, "reused"
+        if set(info.holders()) - {os.getpid()}:
+            return False, "reused (held by other test sessions)"
+        if restart:
+            return True, "restarted"
+        return True, "restarted (configuration changed)"
+
+    def _check_started(self, info, starter, started):
+        if not started:
+            if starter._scans_binary():
+                limit = f"{starter.max_read_bytes} bytes"
+            else:
+                limit = f"{starter.max_read_lines} lines"
+            raise RuntimeError(
+                "Could not start process {}, the specified "
+                "log pattern was not found within {}.".format(info.name, limit)
+            )
+        self.log.debug("%s process startup detected", info.name)
+        durations = starter.startup_durations
+        if durations:
+            durations = {"total": sum(durations.values()), **durations}
+            previous = [entry["total"] for entry in info.startup_history()]
+            info.record_startup(durations)
+            self._startups.append((info.name, durations, baseline(previous)))
+
+    def ensure_all(self, starters, restart=False, persist_logs=True):
+        """Start several processes concurrently and return once all of
+        them are ready.
+
+        Processes are started in parallel, except that a process is only
+        started after every process listed in its starter ``depends_on``
+        has been started and detected as ready.
+
+        @param starters: mapping or iterable of (name, preparefunc) pairs,
+                         where each preparefunc is a subclass of ProcessStarter.
+
+        @param restart: force restarting processes that are running.
+
+        @return: dict mapping each process name to the (PID, logfile)
+                 pair returned by ``XProcess.ensure``."""
+        starters = dict(starters)
+        pending = self._dependency_graph(starters)
+        running, results, errors = {}, {}, []
+
+        with ThreadPoolExecutor(max_workers=max(len(starters), 1)) as executor:
+            while pending or running:
+                for name in [n for n, deps in pending.items() if not deps]:
+                    del pending[name]
+                    future = executor.submit(
+                        self.ensure, name, starters[name], restart, persist_logs
+                    )
+                    running[future] = name
+                done, _ = wait_futures(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as err:
+                        errors.append(err)
+                        # do not start anything else, but let the processes
+                        # already starting finish before reporting the error
+                        pending.clear()
+                    for deps in pending.values():
+                        deps.discard(name)
+
+        if errors:
+            raise errors[0]
+        return results
+
+    def _dependency_graph(self, starters):
+        """Map each process name to the names of the processes it still
+        has to wait for, validating ``depends_on`` declarations."""
+        graph = {}
+        for name, preparefunc in starters.items():
+            deps = set(getattr(preparefunc, "depends_on", ()))
+            for dep in deps - starters.keys():
+                # getinfo would create control directories for unknown names
+                running = (
+                    self.rootdir.join(dep, "xprocess.PID").check()
+                    and self.getinfo(dep).isrunning()
+                )
+                if not running:
+                    raise ValueError(
+                        f"process {name!r} depends on {dep!r}, which is "
+                        "neither being started nor running"
+                    )
+            graph[name] = deps & starters.keys()
+
+        # detect cycles up front, before anything is started
+        remaining = {name: set(deps) for name, deps in graph.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(
+                    "dependency cycle between processes: {}".format(
+                        ", ".join(sorted(remaining))
+                    )
+                )
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return graph
+
+    def _skip_previous_log_blocks(self, info, log_file_handle):
+        """Seek log_file_handle to the start of the newest log block."""
+        start = LogBlockIndex(info.logpath).refresh().last_block_start
+        if start is not None:
+            log_file_handle.seek(start)
 
     def _infos(self):
         return (self.getinfo(p.basename) for p in self.rootdir.listdir())
 
     def _xkill(self, tw):
         ret = 0
-        for info in self._infos():
-            termret = info.terminate()
+        infos = list(self._infos())
+        # terminate all processes at once, instead of one after the other
+        codes = terminate_all(infos, force=True)
+        for n, info in enumerate(infos):
+            termret = codes[n]
             ret = ret or (termret == 1)
             status = {
                 1: "TERMINATED",
@@ -319,16 +1090,43 @@ class XProcess:
                 0: "NO PROCESS FOUND",
             }[termret]
             tmpl = "{info.pid} {info.name} {status}"
-            tw.line(tmpl.format(**locals()))
+            tw.line(tmpl.format(info=info, status=status))
         return ret
 
     def _xshow(self, tw):
         for info in self._infos():
             running = "LIVE" if info.isrunning() else "DEAD"
-            tmpl = "{info.pid} {info.name} {running} {info.logpath}"
-            tw.line(tmpl.format(**locals()))
+            size = format_size(info.logpath.size() if info.logpath.check() else 0)
+            archives = archived_logs(info.logpath)
+            if archives:
+                archived = format_size(sum(os.path.getsize(p) for p in archives))
+                size += f" (+{len(archives)} archived, {archived})"
+            decision = info.read_state().get("decision", "")
+            tmpl = "{info.pid} {info.name} {running} {info.logpath} {size} {decision}"
+            tw.line(tmpl.format(**locals()).rstrip())
         return 0
 
+    def _xstats(self, tw, factor=None):
+        ret = 0
+        for info in self._infos():
+            history = info.startup_history()
+            if not history:
+                continue
+            for line in summarize(info.name, history, factor):
+                tw.line(line)
+            ret = ret or int(regressed(history, factor))
+        return ret
+
+    def _release_replaced(self, name):
+        """Release the resources of the previous instances of process
+        ``name``, keeping those of the newest one. Pools restart their
+        instances over and over, their log handles would pile up until
+        the end of the session otherwise."""
+        resources = [r for r in self.resources if r.name == name]
+        for xresource in resources[:-1]:
+            self.resources.remove(xresource)
+            xresource.release()
+
     def _force_clean_up(self):
         for xresource in self.resources:
             xresource.release()
@@ -349,20 +1147,119 @@ class ProcessStarter(ABC):
     @cvar max_read_lines: The maximum amount of lines of the log that will be read
                     before presuming the attached process dead.
 
+    @cvar patterns: Patterns to match in the log besides pattern, either regexes
+    or dicts matching JSON lines whose fields have the given values. Lines are
+    searched once for all patterns, see xprocess.matching.PatternSet.
+
+    @cvar patterns_mode: "all" if every one of pattern and patterns must be
+    matched for the process to be considered started, "any" if one is enough.
+
+    @cvar max_read_bytes: The maximum amount of bytes of the log that will be read
+    before presuming the attached process dead. When set, or when max_read_lines
+    is None, the log is searched for pattern in large binary chunks instead of
+    line by line, which scales to processes logging a lot before they are
+    started. Only the matching line is echoed to the terminal then.
+
     @cvar terminate_on_interrupt: When set to True, xprocess will attempt to
     terminate and clean-up the resources of started processes upon interruption
-    during the test run (e.g. SIGINT, CTRL+C or internal errors)."""
+    during the test run (e.g. SIGINT, CTRL+C or internal errors).
+
+    @cvar depends_on: Names of processes that must be started and ready before
+    this one is started by XProcess.ensure_all.
+
+    @cvar error_pattern: A pattern, or a list of patterns, which abort startup
+    with a StartupError as soon as a line of the log matches any of them.
+
+    @cvar probes: Readiness probes (see xprocess.probes) which must all succeed
+    for the process to be considered started. They run concurrently with
+    pattern matching.
+
+    @cvar sd_notify: When set to True, a NOTIFY_SOCKET is exported to the process
+    and it is considered started once it sends READY=1, as with systemd's
+    sd_notify(3).
+
+    @cvar watchdog_interval: Interval in seconds exported to sd_notify processes
+    as WATCHDOG_USEC, for processes sending WATCHDOG=1 heartbeats.
+
+    @cvar listen_sockets: Addresses (TCP ports, (host, port) tuples or unix socket
+    paths) xprocess binds and listens on before starting the process, passing
+    the sockets to it following the systemd socket activation protocol
+    (LISTEN_FDS/LISTEN_PID). Unless other ways to detect startup are provided,
+    the process is considered started right away since connections are queued
+    by the kernel until it accepts them.
+
+    @cvar log_max_bytes: When the persisted log file has reached this size by the
+    time the process is (re)started, it is rotated before a new block is added.
+
+    @cvar log_max_blocks: When the persisted log file already holds this many
+    blocks (one per process start) it is rotated before a new block is added.
+
+    @cvar log_backup_count: Number of rotated log files to keep around, older
+    ones are deleted.
+
+    @cvar log_compression: Compression of rotated log files, one of "gzip", "bz2",
+    "xz" or "zstd" (python 3.14+). Rotated logs are not compressed by default.
+
+    @cvar restart_overlap: When set to True, restarting a running process starts
+    the new instance first and only terminates the previous one, in the
+    background, once the new one is ready, so restarts cost no more than
+    startups. Both instances run side by side meanwhile, so they must not
+    compete for the same ports or data.
+
+    @cvar restart_on_crash: How many times the process is started again during
+    a test session when the watchdog (see ``--xwatchdog``) finds it has exited
+    without being terminated. It is left down by default.
+
+    @ivar startup_durations: Seconds spent in each startup phase once the
+    process has been started: "pattern" from spawning the process until the
+    pattern matched (and probes and sd_notify readiness succeeded), then
+    "startup_check" until the startup check succeeded. They are recorded in
+    the process control directory, see ``--xstats``."""
 
     env = None
     timeout = 120
     popen_kwargs = {}
     max_read_lines = 50
+    max_read_bytes = None
+    patterns = ()
+    patterns_mode = "all"
+    # size of the chunks read when searching the log in binary mode
+    read_chunk_size = 256 * 1024
     terminate_on_interrupt = False
+    depends_on = ()
+    error_pattern = None
+    probes = ()
+    sd_notify = False
+    watchdog_interval = None
+    listen_sockets = ()
+    log_max_bytes = None
+    log_max_blocks = None
+    log_backup_count = 1
+    log_compression = None
+    restart_on_crash = 0
+    restart_overlap = False
 
     def __init__(self, control_dir, process):
         self._max_time = None
+        self._log_file = None
         self.control_dir = control_dir
         self.process = process
+        # reported now rather than at the first rotation
+        log_opener(self.log_compression)
+        # Popen instance of the started process and, if sd_notify is
+        # enabled, its NotifySocket. Both are set by XProcess.ensure
+        self.popen = None
+        self.notify_socket = None
+        self.startup_durations = {}
+        # MatchEvent of each readiness pattern matched so far
+        self.events = []
+        # copies of the probes waited on, holding their attempts
+        self.waited_probes = []
+        # end of the previous startup phase, set when the process is spawned
+        self._phase_start = None
+        # (psutil.Process, state) of the instance replaced by an overlapped
+        # restart and of the new one, until the new one is ready
+        self._overlapped = None
 
     @property
     @abstractmethod
@@ -379,6 +1276,35 @@ class ProcessStarter(ABC):
         """Used to assert process responsiveness after pattern match"""
         return True
 
+    def fingerprint(self):
+        """Return a hash of the configuration of the process: args, env
+        (but for VOLATILE_ENV), popen_kwargs, listen_sockets, sd_notify and
+        watchdog_interval. A running process is restarted by XProcess.ensure
+        when its fingerprint does not match the one recorded when it was
+        started. Override to account for anything else the process depends
+        on, e.g. configuration files."""
+        env = self.env
+        if env is not None:
+            env = {k: v for k, v in env.items() if k not in VOLATILE_ENV}
+        config = {
+            "args": [str(arg) for arg in self.args],
+            "env": env,
+            "popen_kwargs": self.popen_kwargs,
+            "listen_sockets": list(self.listen_sockets),
+            "sd_notify": self.sd_notify,
+            "watchdog_interval": self.watchdog_interval,
+        }
+        data = json.dumps(config, sort_keys=True, default=_fingerprint_default)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def _end_phase(self, phase):
+        """Record the time spent in a startup phase, which ends now."""
+        if self._phase_start is None:
+            return
+        now = monotonic()
+        self.startup_durations[phase] = now - self._phase_start
+        self._phase_start = now
+
     def wait_callback(self):
         """Assert that process is ready to answer queries using provided
         callback funtion. Will raise TimeoutError if self.callback does not
@@ -387,6 +1313,7 @@ class ProcessStarter(ABC):
             sleep(0.1)
             if self.startup_check():
                 return True
+            self._check_process_alive()
             if datetime.now() > self._max_time:
                 raise TimeoutError(
                     "The provided startup callback could not assert process\
@@ -397,32 +1324,234 @@ class ProcessStarter(ABC):
                 )
 
     def wait(self, log_file):
-        """Wait until the pattern is matched or callback returns successful."""
+        """Wait until the pattern is matched, probes succeed and callback
+        returns successful."""
         has_callback = type(self).startup_check != ProcessStarter.startup_check
-        has_pattern = self.pattern is not None
-        # cut it short, at least one provided way to
-        # know if the process has started
-        if not has_callback and not has_pattern:
-            return False
-        # here we know that at least one of them has been provided
-        pattern_ok, callback_ok = False, False
+        has_pattern = self._has_patterns()
+        has_notify = self.notify_socket is not None
+        # cut it short, at least one provided way to know if the process
+        # has started unless it has been given its listening sockets
+        if not (has_callback or has_pattern or has_notify or self.probes):
+            return bool(self.listen_sockets)
+        # here we know that at least one of them has been provided,
+        # all of the provided ones must succeed
         self._max_time = datetime.now() + timedelta(seconds=self.timeout)
-        if has_pattern:
-            pattern_ok = self.wait_pattern(log_file)
+        self._log_file = log_file
+        probes = self._copy_probes()
+        if probes:
+            # probes run concurrently with pattern matching
+            cancelled = threading.Event()
+            with ThreadPoolExecutor(max_workers=len(probes)) as executor:
+                probing = [
+                    executor.submit(self._wait_probe, probe, cancelled)
+                    for probe in probes
+                ]
+                try:
+                    if has_pattern and not self.wait_pattern(log_file):
+                        return False
+                    if has_notify:
+                        self.wait_notify()
+                    for future in probing:
+                        future.result()
+                finally:
+                    cancelled.set()
+        else:
+            if has_pattern and not self.wait_pattern(log_file):
+                return False
+            if has_notify:
+                self.wait_notify()
+        if has_pattern or has_notify or self.probes:
+            self._end_phase("pattern")
         if has_callback:
-            callback_ok = self.wait_callback()
-        # when both provided, both should be checked
-        if has_callback and has_pattern:
-            return pattern_ok and callback_ok
-        # one or the other
-        return pattern_ok or callback_ok
+            # returns once the check succeeded, raises otherwise
+            self.wait_callback()
+            self._end_phase("startup_check")
+        return True
+
+    def wait_notify(self):
+        """Wait until the process sends READY=1 to its NOTIFY_SOCKET. Will
+        raise TimeoutError if it does not before self.timeout seconds."""
+        while not self.notify_socket.ready:
+            self._check_process_alive()
+            if self._remaining() <= 0:
+                raise self._notify_timeout()
+            fields = self.notify_socket.receive(min(self._remaining(), 1))
+            self._log_notify_status(fields)
+        return True
+
+    def _log_notify_status(self, fields):
+        if fields and "STATUS" in fields:
+            self.log_line(f"sd_notify STATUS={fields['STATUS']}")
+
+    def _notify_timeout(self):
+        return TimeoutError(
+            "The process did not send READY=1 to its NOTIFY_SOCKET within "
+            "the specified time interval of {} seconds".format(self.timeout)
+        )
 
     def wait_pattern(self, log_file):
         """Wait until the pattern is mached and callback returns successful."""
+        if self._scans_binary():
+            return self.scan_pattern(log_file)
         raw_lines = self.get_lines(log_file)
         lines = map(self.log_line, self.filter_lines(raw_lines))
-        has_match = any(re.search(self.pattern, line) for line in lines)
-        return has_match
+        error_patterns = self._error_patterns()
+        patterns = self._pattern_set()
+        for line in lines:
+            self._check_error_patterns(line, error_patterns)
+            if patterns.match(line):
+                return True
+        return False
+
+    def _has_patterns(self):
+        return self.pattern is not None or bool(self.patterns)
+
+    def _pattern_set(self):
+        """Return a PatternSet of pattern and patterns, recording the
+        patterns it matches in self.events."""
+        patterns = [] if self.pattern is None else [self.pattern]
+        pattern_set = PatternSet(patterns + list(self.patterns), self.patterns_mode)
+        self.events = pattern_set.events
+        return pattern_set
+
+    def _describe_patterns(self):
+        if not self.patterns:
+            return self.pattern
+        patterns = [] if self.pattern is None else [self.pattern]
+        return f"{self.patterns_mode} of {patterns + list(self.patterns)!r}"
+
+    def _scans_binary(self):
+        return self.max_read_bytes is not None or self.max_read_lines is None
+
+    def scan_pattern(self, log_file):
+        """Wait until the pattern is matched, searching the log in binary
+        chunks instead of line by line, see ``max_read_bytes``."""
+        scanning = self._scan(log_file)
+        with LogWatcher(log_file.name) as watcher:
+            try:
+                while True:
+                    next(scanning)
+                    watcher.wait(min(self._remaining(), 1))
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                scanning.close()
+
+    def _scan(self, log_file):
+        """Search the log for pattern, yielding whenever everything written
+        so far has been searched, and return whether pattern matched within
+        ``max_read_bytes`` bytes. log_file is left after the matching line.
+
+        Waiting is left to the caller, so that the same generator serves
+        both the blocking and the asyncio flavors of scan_pattern."""
+        start = log_file.tell()
+        patterns = self._pattern_set()
+        # lines matching the combined patterns are matched one by one
+        scanner = LogScanner(patterns.source or ".", self._error_patterns())
+        with open(log_file.name, "rb") as f:
+            f.seek(start)
+            while True:
+                # polled before reading, an exited process has written
+                # everything by then, including an unterminated last line
+                exited = self.popen is not None and self.popen.poll() is not None
+                data = f.read(self.read_chunk_size)
+                # the last line is still being written otherwise
+                final = not data and (exited or datetime.now() > self._max_time)
+                found = scanner.feed(data, final=final)
+                matched = False
+                while found is not None and not matched:
+                    matched = self._match_scanned(found, patterns)
+                    found = None if matched else scanner.feed(b"", final=final)
+                if matched:
+                    break
+                if (
+                    self.max_read_bytes is not None
+                    and f.tell() - start >= self.max_read_bytes
+                ):
+                    return False
+                if not data:
+                    # everything the process wrote has been searched by now
+                    self._check_process_alive()
+                    yield
+                if datetime.now() > self._max_time:
+                    raise TimeoutError(
+                        "The provided start pattern {} could not be matched "
+                        "within the specified time interval of {} seconds".format(
+                            self._describe_patterns(), self.timeout
+                        )
+                    )
+        log_file.seek(start + scanner.end)
+        return True  # noqa: B901
+
+    def _match_scanned(self, found, patterns):
+        line = found.line.decode("utf-8", errors="surrogateescape")
+        if found.error_pattern is not None:
+            pattern = found.error_pattern.pattern.decode(
+                "utf-8", errors="surrogateescape"
+            )
+            raise self._startup_error(
+                f"error pattern {pattern!r} matched while "
+                f"starting process: {line.strip()}"
+            )
+        return patterns.match(self.log_line(line))
+
+    def _copy_probes(self):
+        """Return copies of the probes to wait on. Probes declared on the
+        starter class are shared by every process it starts, possibly at
+        the same time, while probes keep state such as their attempts."""
+        self.waited_probes = [copy.copy(probe) for probe in self.probes]
+        return self.waited_probes
+
+    def _wait_probe(self, probe, cancelled):
+        ready = probe.wait(self._remaining(), cancelled, self._check_process_alive)
+        if not ready and not cancelled.is_set():
+            raise TimeoutError(
+                "{!r} could not assert process responsiveness within the "
+                "specified time interval of {} seconds".format(probe, self.timeout)
+            )
+
+    def _error_patterns(self):
+        if self.error_pattern is None:
+            return []
+        if isinstance(self.error_pattern, str):
+            return [re.compile(self.error_pattern)]
+        return [re.compile(pattern) for pattern in self.error_pattern]
+
+    def _check_error_patterns(self, line, error_patterns):
+        for pattern in error_patterns:
+            if pattern.search(line):
+                raise self._startup_error(
+                    f"error pattern {pattern.pattern!r} matched while "
+                    f"starting process: {line.strip()}"
+                )
+
+    def _check_process_alive(self):
+        """Raise StartupError if the started process has already exited."""
+        if self.popen is not None and self.popen.poll() is not None:
+            raise self._startup_error(
+                f"process exited with code {self.popen.returncode} "
+                "before startup was detected"
+            )
+
+    def _startup_error(self, reason):
+        name = os.path.basename(str(self.control_dir))
+        returncode = self.popen.poll() if self.popen is not None else None
+        log_tail = _read_log_tail(getattr(self._log_file, "name", None))
+        if self.popen is not None and returncode is None:
+            # a process which logged an error must not be reused later on
+            # as if it had started, see XProcess._restart_decision
+            info = self.process.getinfo(name)
+            if info.pid == self.popen.pid:
+                info._mark_terminated()
+            terminate_trees([self.popen.pid])
+        msg = f"Could not start process {name}, {reason}"
+        if log_tail:
+            msg += "\nlast lines of process log:\n" + "\n".join(
+                f"    {line}" for line in log_tail
+            )
+        err = StartupError(msg)
+        err.returncode, err.log_tail = returncode, log_tail
+        return err
 
     def filter_lines(self, lines):
         """fetch first <max_read_lines>, ignoring blank lines."""
@@ -438,15 +1567,171 @@ class ProcessStarter(ABC):
         """Read and yield one line at a time from log_file. Will raise
         TimeoutError if pattern is not matched before self.timeout
         seconds."""
+        with LogWatcher(getattr(log_file, "name", None)) as watcher:
+            partial = ""
+            while True:
+                line, partial = self._join_partial(log_file.readline(), partial)
+                if partial:
+                    # the process is in the middle of writing a line
+                    watcher.wait(min(self._remaining(), 1))
+                elif not line:
+                    # everything the process wrote has been read by now
+                    self._check_process_alive()
+                    watcher.wait(min(self._remaining(), 1))
+                if datetime.now() > self._max_time:
+                    raise TimeoutError(
+                        "The provided start pattern {} could not be matched \
+                        within the specified time interval of {} seconds".format(
+                            self._describe_patterns(), self.timeout
+                        )
+                    )
+                yield line
+
+    @staticmethod
+    def _join_partial(line, partial):
+        """Return (line, partial), holding back incomplete lines until the
+        rest of them has been written. An incomplete line is handed out
+        as it is if nothing has been written since it was read."""
+        if not line:
+            return partial, ""
+        line = partial + line
+        if line.endswith("\n"):
+            return line, ""
+        return "", line
+
+    def _remaining(self):
+        """Seconds left before startup times out."""
+        return (self._max_time - datetime.now()).total_seconds()
+
+
+class AsyncProcessStarter(ProcessStarter):
+    """ProcessStarter variant whose startup detection runs on an asyncio
+    event loop, to be used with ``XProcess.aensure``.
+
+    ``startup_check`` may be a coroutine function and waiting for ``pattern``
+    suspends the calling task instead of blocking the event loop, so many
+    processes can be started and probed concurrently on a single loop."""
+
+    async def startup_check(self):
+        """Used to assert process responsiveness after pattern match"""
+        return True
+
+    async def wait_callback(self):
+        """Await until startup_check returns True. Will raise TimeoutError
+        if it does not before self.timeout seconds"""
         while True:
-            line = log_file.readline()
-            if not line:
-                time.sleep(0.1)
+            await asyncio.sleep(0.1)
+            ok = self.startup_check()
+            if inspect.isawaitable(ok):
+                ok = await ok
+            if ok:
+                return True
+            self._check_process_alive()
             if datetime.now() > self._max_time:
                 raise TimeoutError(
-                    "The provided start pattern {} could not be matched \
-                    within the specified time interval of {} seconds".format(
-                        self.pattern, self.timeout
-                    )
+                    "The provided startup callback could not assert process "
+                    "responsiveness within the specified time interval of {} "
+                    "seconds".format(self.timeout)
                 )
-            yield line
+
+    async def wait(self, log_file):
+        """Wait until the pattern is matched, probes succeed and callback
+        returns successful."""
+        has_callback = type(self).startup_check != AsyncProcessStarter.startup_check
+        has_pattern = self._has_patterns()
+        has_notify = self.notify_socket is not None
+        if not (has_callback or has_pattern or has_notify or self.probes):
+            return bool(self.listen_sockets)
+        self._max_time = datetime.now() + timedelta(seconds=self.timeout)
+        self._log_file = log_file
+        # probes are blocking, run them in the default executor
+        # concurrently with pattern matching
+        loop = asyncio.get_running_loop()
+        cancelled = threading.Event()
+        probing = [
+            loop.run_in_executor(None, self._wait_probe, probe, cancelled)
+            for probe in self._copy_probes()
+        ]
+        try:
+            if has_pattern and not await self.wait_pattern(log_file):
+                return False
+            if has_notify:
+                await self.wait_notify()
+            await asyncio.gather(*probing)
+        finally:
+            cancelled.set()
+            await asyncio.gather(*probing, return_exceptions=True)
+        if has_pattern or has_notify or self.probes:
+            self._end_phase("pattern")
+        if has_callback:
+            await self.wait_callback()
+            self._end_phase("startup_check")
+        return True
+
+    async def wait_notify(self):
+        """Await until the process sends READY=1 to its NOTIFY_SOCKET."""
+        while not self.notify_socket.ready:
+            self._check_process_alive()
+            if self._remaining() <= 0:
+                raise self._notify_timeout()
+            fields = await self.notify_socket.receive_async(min(self._remaining(), 1))
+            self._log_notify_status(fields)
+        return True
+
+    async def wait_pattern(self, log_file):
+        """Await until the pattern is matched within the first
+        <max_read_lines> non blank lines."""
+        if self._scans_binary():
+            return await self.scan_pattern(log_file)
+        read_lines = 0
+        error_patterns = self._error_patterns()
+        patterns = self._pattern_set()
+        lines = self.get_lines(log_file)
+        try:
+            async for line in lines:
+                if not line.strip():
+                    continue
+                self._check_error_patterns(self.log_line(line), error_patterns)
+                if patterns.match(line):
+                    return True
+                read_lines += 1
+                if read_lines >= self.max_read_lines:
+                    return False
+        finally:
+            await lines.aclose()
+
+    async def scan_pattern(self, log_file):
+        """Await until the pattern is matched, searching the log in binary
+        chunks instead of line by line, see ``max_read_bytes``."""
+        scanning = self._scan(log_file)
+        with LogWatcher(log_file.name) as watcher:
+            try:
+                while True:
+                    next(scanning)
+                    await watcher.wait_async(min(self._remaining(), 1))
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                scanning.close()
+
+    async def get_lines(self, log_file):
+        """Asynchronously read and yield one line at a time from log_file.
+        Will raise TimeoutError if pattern is not matched before
+        self.timeout seconds."""
+        with LogWatcher(getattr(log_file, "name", None)) as watcher:
+            partial = ""
+            while True:
+                line, partial = self._join_partial(log_file.readline(), partial)
+                if partial:
+                    await watcher.wait_async(min(self._remaining(), 1))
+                elif not line:
+                    self._check_process_alive()
+                    await watcher.wait_async(min(self._remaining(), 1))
+                if datetime.now() > self._max_time:
+                    raise TimeoutError(
+                        "The provided start pattern {} could not be matched "
+                        "within the specified time interval of {} seconds".format(
+                            self._describe_patterns(), self.timeout
+                        )
+                    )
+                yield line